@@ -1,20 +1,318 @@
-from flask import Flask, jsonify, request
+import os
+import sys
+from datetime import timezone
 
-from weekly_prompt import generate_weekly_prompt
+# Allow `python backend/app.py` from the repo root to import the backend package and module.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-app = Flask(__name__)
+from flask import Blueprint, Flask, jsonify, request, send_from_directory, url_for
+from sqlalchemy.exc import IntegrityError
 
+from backend.database import ensure_indexes, init_database
+from backend.home_cache import home_feed_cache
+from backend.http_cache import compress_response, conditional_json, etag_for, is_not_modified
+from backend.images import FORMATS, MAX_UPLOAD_BYTES, images_available, pick_width, store_image, store_path
+from backend.metrics import init_metrics
+from backend.passwords import HashingBusy
+from backend.search import init_search, search_available, search_groups, search_posts
+from backend.weekly_prompt import cache_validators, get_weekly_prompt_entry
+from module import db, reconcile_counts_command, FEED_PAGE_SIZE, NewsGroup, Post, User
 
-@app.get("/api/weekly-prompt")
+# Largest page a client may ask for from the post listing
+MAX_PAGE_SIZE = 100
+# Seconds a client is asked to wait after a 503 from a saturated password hashing pool
+RETRY_AFTER = 2
+# Room for the multipart boundaries and headers around an upload of MAX_UPLOAD_BYTES
+MULTIPART_OVERHEAD = 64 * 1024
+
+api = Blueprint("api", __name__)
+
+
+def create_app(database_url=None, config=None):
+    """
+    Build the API app: database (DATABASE_URL unless database_url is given), tables,
+    search index, metrics and routes. Nothing here loads the Gemini SDK; that waits for
+    the first prompt that actually needs generating.
+
+    config entries override the defaults, ex: {"PROMPT_SCHEDULER": True} starts the
+    background prompt pre-generation (PROMPT_SCHEDULER=1 in the environment does the same).
+    """
+    app = Flask(__name__)
+    # Bodies over this are refused with 413 before they are read
+    app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD
+    app.config["PROMPT_SCHEDULER"] = os.environ.get("PROMPT_SCHEDULER") == "1"
+    app.config.update(config or {})
+    init_database(app, db, database_url)
+    app.cli.add_command(reconcile_counts_command)
+
+    with app.app_context():
+        # Tables live on the primary; the read bind is a replica (or read-only pool) of it
+        db.create_all(bind_key=None)
+        ensure_indexes(db)
+        init_search()
+        init_metrics(app, db.engines.values())
+
+    app.register_blueprint(api)
+    app.after_request(allow_cross_origin)
+    app.after_request(compress_response)
+
+    if app.config["PROMPT_SCHEDULER"]:
+        from backend.prompt_scheduler import PromptScheduler
+
+        scheduler = app.extensions["prompt_scheduler"] = PromptScheduler(app)
+        scheduler.start()
+    return app
+
+
+def __getattr__(name):
+    # `from backend.app import app` (asgi.py, the scripts) builds the default app on first use
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def allow_cross_origin(response):
+    # The static site is served from a different port than the API
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PATCH, DELETE, OPTIONS"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    response.headers["Access-Control-Expose-Headers"] = "ETag, Last-Modified"
+    return response
+
+
+def error(message, status=400):
+    return jsonify({"error": message}), status
+
+
+@api.app_errorhandler(HashingBusy)
+def hashing_busy(e):
+    # Every hashing slot stayed taken for PASSWORD_HASH_QUEUE_TIMEOUT: shed load rather than queue more
+    response, status = error("too many logins in progress, try again shortly", 503)
+    response.headers["Retry-After"] = str(RETRY_AFTER)
+    return response, status
+
+
+def string_field(data, name):
+    """data[name] stripped, or None when absent; ValueError unless it is a non-empty string."""
+    if name not in data:
+        return None
+    value = data[name]
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{name} must be a non-empty string")
+    return value.strip()
+
+
+def guest_user():
+    """Author used for posts from visitors who aren't signed in (the site has no login yet)."""
+    user = User.query.filter_by(username="guest").first()
+    if user is None:
+        user = User(username="guest", email="guest@notable.local")
+        db.session.add(user)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request's first post created it in the meantime
+            db.session.rollback()
+            user = User.query.filter_by(username="guest").one()
+    return user
+
+
+@api.get("/api/weekly-prompt")
 def weekly_prompt():
     group_name = request.args.get("groupName", "").strip() or "Your Group"
     category = request.args.get("category", "").strip() or "General"
 
-    prompt = generate_weekly_prompt(category, group_name)
-    response = jsonify({"prompt": prompt})
-    response.headers["Access-Control-Allow-Origin"] = "*"
+    entry = get_weekly_prompt_entry(category, group_name)
+    # Everyone in the group gets the same question until the week rolls over, so caches may keep it until then
+    etag, last_modified, max_age = cache_validators(entry)
+    return conditional_json(lambda: {"prompt": entry.prompt}, etag, last_modified=last_modified, max_age=max_age)
+
+
+@api.get("/api/search")
+def search():
+    """Ranked full-text search: ?q=...&type=posts|groups&page=1"""
+    if not search_available():
+        return error("search requires the SQLite database", 501)
+    kind = request.args.get("type", "posts")
+    if kind not in ("posts", "groups"):
+        return error("type must be 'posts' or 'groups'")
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", 20, type=int)
+
+    search_fn = search_posts if kind == "posts" else search_groups
+    results, has_more = search_fn(request.args.get("q", ""), page=page, per_page=per_page)
+    return jsonify({"results": results, "page": page, "has_more": has_more})
+
+
+def image_urls(image, external=True):
+    """
+    URLs for a stored image: a default-size JPEG plus a srcset per format. With
+    external=False they are paths, for storing without tying rows to this host name.
+    """
+    def url(ext, width):
+        return url_for("api.image_file", name=image["variants"][ext][width], _external=external)
+
+    return {
+        "id": image["id"],
+        "width": image["width"],
+        "height": image["height"],
+        "url": url("jpg", pick_width(image["widths"])),
+        "srcset": {
+            ext: ", ".join(f"{url(ext, width)} {width}w" for width in image["widths"])
+            for ext in FORMATS
+        },
+    }
+
+
+def stored_upload():
+    """Store the uploaded "image" file; returns (image, None) or (None, error response)."""
+    if not images_available():
+        return None, error("image uploads require Pillow", 501)
+    upload = request.files.get("image")
+    if upload is None:
+        return None, error("image file is required")
+    try:
+        # One byte past the limit is enough for store_image to reject an oversized file
+        return store_image(upload.stream.read(MAX_UPLOAD_BYTES + 1)), None
+    except ValueError as e:
+        return None, error(str(e))
+
+
+@api.post("/api/images")
+def upload_image():
+    """Upload an image (multipart field "image"), e.g. a group thumbnail; returns its URLs."""
+    image, failure = stored_upload()
+    if failure:
+        return failure
+    return jsonify(image_urls(image)), 201
+
+
+@api.get("/images/<path:name>")
+def image_file(name):
+    # Names are content hashes, so a URL's bytes never change
+    response = send_from_directory(store_path(), name, max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
     return response
 
 
+@api.post("/api/users/<int:user_id>/pfp")
+def upload_pfp(user_id):
+    """Upload a profile picture; User.pfp stores its URL path rather than the image."""
+    user = User.query.get_or_404(user_id)
+    image, failure = stored_upload()
+    if failure:
+        return failure
+    user.pfp = image_urls(image, external=False)["url"]
+    db.session.commit()
+    return jsonify({**user.to_dict(), "image": image_urls(image)})
+
+
+@api.get("/api/users/<int:user_id>/groups")
+def joined_groups(user_id):
+    """Home page group list for a user, served from the per-user cache when possible."""
+    etag = home_feed_cache.etag(user_id)
+    if etag is not None and is_not_modified(etag):
+        return conditional_json(None, etag)
+
+    user = User.query.get_or_404(user_id)
+    groups = user.get_joined_groups_data()
+    etag = home_feed_cache.etag(user_id) or etag_for(user_id, groups)
+    return conditional_json(lambda: {"groups": groups}, etag)
+
+
+@api.post("/api/groups")
+def find_or_create_group():
+    """Return the server-side group for a name and category, creating it on first use."""
+    data = request.get_json(silent=True) or {}
+    try:
+        name = string_field(data, "name")
+        category = string_field(data, "category") or "General"
+    except ValueError as e:
+        return error(str(e))
+    if name is None:
+        return error("name is required")
+
+    # Local groups that merely share a name (ex: "Book Club" under Books and under Music) stay apart
+    group = NewsGroup.query.filter_by(name=name, category=category).first()
+    if group is None:
+        group = NewsGroup(name=name, category=category)
+        db.session.add(group)
+        db.session.commit()
+    return jsonify(group.to_dict())
+
+
+@api.get("/api/groups/<int:group_id>/posts")
+def list_posts(group_id):
+    group = NewsGroup.query.get_or_404(group_id)
+    limit = max(min(request.args.get("limit", FEED_PAGE_SIZE, type=int), MAX_PAGE_SIZE), 1)
+    cursor = request.args.get("cursor")
+
+    # The newest (timestamp, id) changes on every create and edit, and post_count on every delete,
+    # so together they validate any page; both are index lookups rather than a page load
+    latest = db.session.query(Post.timestamp, Post.id).filter(Post.group_id == group.id).order_by(
+        Post.timestamp.desc(), Post.id.desc()
+    ).first()
+    etag = etag_for(group.id, group.post_count, latest, cursor, limit)
+    last_modified = latest.timestamp.replace(tzinfo=timezone.utc) if latest else None
+
+    def page():
+        posts, next_cursor = group.get_feed(limit=limit, cursor=cursor)
+        return {"posts": [post.to_dict() for post in posts], "next_cursor": next_cursor}
+
+    try:
+        return conditional_json(page, etag, last_modified=last_modified)
+    except ValueError as e:
+        return error(str(e))
+
+
+@api.post("/api/groups/<int:group_id>/posts")
+def create_post(group_id):
+    group = NewsGroup.query.get_or_404(group_id)
+    data = request.get_json(silent=True) or {}
+    try:
+        content = string_field(data, "content")
+        title = string_field(data, "title")
+    except ValueError as e:
+        return error(str(e))
+    if content is None:
+        return error("content is required")
+    title = title or content[:60]
+
+    user = User.query.get(data["user_id"]) if data.get("user_id") else guest_user()
+    if user is None:
+        return error("unknown user_id")
+
+    post = Post.create(title=title[:200], content=content, user_id=user.id, group_id=group.id)
+    return jsonify(post.to_dict()), 201
+
+
+@api.patch("/api/posts/<int:post_id>")
+def edit_post(post_id):
+    post = Post.query.get_or_404(post_id)
+    data = request.get_json(silent=True) or {}
+    try:
+        content = string_field(data, "content")
+        title = string_field(data, "title")
+    except ValueError as e:
+        return error(str(e))
+    if content is None and title is None:
+        return error("content or title is required")
+    post.edit_content(new_content=content, new_title=title[:200] if title else None)
+    return jsonify(post.to_dict())
+
+
+@api.delete("/api/groups/<int:group_id>/posts")
+def clear_posts(group_id):
+    group = NewsGroup.query.get_or_404(group_id)
+    if not Post.delete_all_in_group(group.id):
+        return error("could not clear posts", 500)
+    return "", 204
+
+
 if __name__ == "__main__":
+    # The reloader's parent process only watches files; the child serves requests and runs the scheduler
+    reloader_parent = os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+    app = create_app(config={"PROMPT_SCHEDULER": False} if reloader_parent else None)
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,151 @@
+"""
+ASGI entry point: serves /api/weekly-prompt and the live post streams natively on the event
+loop and hands every other request to the Flask app.
+
+Run with an ASGI server from the repo root, e.g. `uvicorn backend.asgi:app --port 5000`.
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import app as flask_app
+from backend.gemini_client import get_gemini
+from backend.live_updates import live_updates
+from backend.http_cache import cache_headers, validators_match
+from backend.weekly_prompt import cache_validators, default_prompt, get_weekly_prompt_entry_async
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:  # flask[async] / asgiref not installed: only the prompt endpoint is served
+    WsgiToAsgi = None
+
+# Seconds a prompt request may wait on Gemini before the default question is returned
+PROMPT_DEADLINE = float(os.environ.get("PROMPT_DEADLINE_MS", "1500")) / 1000
+
+# Seconds between keepalive comments on an idle stream, so proxies don't close it
+LIVE_KEEPALIVE = float(os.environ.get("LIVE_KEEPALIVE_S", "25"))
+
+GROUP_EVENTS_PATH = re.compile(r"^/api/groups/(\d+)/events$")
+
+_wsgi_app = WsgiToAsgi(flask_app) if WsgiToAsgi else None
+
+
+async def app(scope, receive, send):
+    group_events = GROUP_EVENTS_PATH.match(scope.get("path", ""))
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/api/weekly-prompt" and scope["method"] == "GET":
+        await _weekly_prompt(scope, send)
+    elif scope["type"] == "http" and group_events and scope["method"] == "GET":
+        await _group_events(scope, receive, send, int(group_events.group(1)))
+    elif _wsgi_app is not None:
+        await _wsgi_app(scope, receive, send)
+    else:
+        await _send_json(send, 404, {"error": "Not found"})
+
+
+async def _weekly_prompt(scope, send):
+    params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    group_name = params.get("groupName", [""])[0].strip() or "Your Group"
+    category = params.get("category", [""])[0].strip() or "General"
+
+    entry = await get_weekly_prompt_entry_async(category, group_name, deadline=PROMPT_DEADLINE)
+    if entry is None:
+        # Past the deadline: a stand-in question that mustn't be cached as this week's
+        await _send_json(send, 200, {"prompt": default_prompt(group_name)}, {"Cache-Control": "no-store"})
+        return
+
+    # Same validators and 304 handling as the Flask route
+    etag, last_modified, max_age = cache_validators(entry)
+    headers = cache_headers(etag, last_modified, max_age)
+    request_headers = dict(scope.get("headers", []))
+    if validators_match(
+        etag, last_modified,
+        request_headers.get(b"if-none-match", b"").decode("latin-1"),
+        request_headers.get(b"if-modified-since", b"").decode("latin-1"),
+    ):
+        await _send(send, 304, b"", headers)
+    else:
+        await _send_json(send, 200, {"prompt": entry.prompt}, headers)
+
+
+async def _group_events(scope, receive, send, group_id):
+    """Server-Sent Events stream of a group's new, edited and cleared posts."""
+    headers = dict(scope.get("headers", []))
+    last_event_id = headers.get(b"last-event-id", b"").decode("latin-1").strip() or None
+    subscription = live_updates.subscribe(group_id, last_event_id)
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        subscription.close()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),  # stop nginx from buffering the stream
+                (b"access-control-allow-origin", b"*"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+        while not subscription.closed:
+            message = await subscription.get(timeout=LIVE_KEEPALIVE)
+            if subscription.reset:
+                # History is gone or the client fell behind: it reloads the list and reconnects
+                await send({"type": "http.response.body", "body": b"event: reset\ndata: {}\n\n"})
+                return
+            if not subscription.closed:
+                await send({"type": "http.response.body", "body": message or b": keepalive\n\n", "more_body": True})
+    except OSError:  # the client went away mid-send
+        pass
+    finally:
+        subscription.close()
+        watcher.cancel()
+
+
+async def _send_json(send, status, payload, headers=None):
+    await _send(send, status, json.dumps(payload).encode(), {"Content-Type": "application/json", **(headers or {})})
+
+
+async def _send(send, status, body, headers):
+    headers = {
+        **headers,
+        "Content-Length": str(len(body)),
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Expose-Headers": "ETag, Last-Modified",
+    }
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(name.lower().encode(), value.encode("latin-1")) for name, value in headers.items()],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _warm_gemini():
+    try:
+        get_gemini().client
+    except RuntimeError:  # no API key: prompts fall back to the default question
+        pass
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Import the SDK and build the client in a thread, before the first prompt request
+            await asyncio.to_thread(_warm_gemini)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
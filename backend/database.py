@@ -0,0 +1,182 @@
+"""
+Database engine profiles.
+
+init_database() picks a profile from the database URL:
+
+- SQLite: WAL journal, synchronous=NORMAL, memory-mapped reads, a busy timeout, and a
+  separate read-only connection pool. SQLite allows one writer at a time but, in WAL mode,
+  any number of readers alongside it.
+- Server databases (Postgres, MySQL...): a sized connection pool with pre-ping and recycling.
+  If DATABASE_READ_URL is set (e.g. a replica), reads go there.
+
+RoutingSession sends writes, flushes and everything the session does after them to the
+primary, and other reads to the "read" bind when there is one.
+"""
+import logging
+import os
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import and_, event, func, inspect, select, text, UniqueConstraint
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import Select
+
+log = logging.getLogger(__name__)
+
+DEFAULT_URL = "sqlite:///notable.db"
+READ_BIND = "read"
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, str(default)))
+
+
+def sqlite_pragmas(read_only=False):
+    pragmas = {
+        "journal_mode": "WAL",
+        # Durable at checkpoints rather than every commit; with WAL this cannot corrupt the file
+        "synchronous": "NORMAL",
+        "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        "mmap_size": _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "cache_size": -_env_int("SQLITE_CACHE_KB", 64 * 1024),  # negative = KiB
+        "temp_store": "MEMORY",
+    }
+    if read_only:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URL."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {
+            # Threads share pooled connections; the busy timeout makes writers queue instead of failing
+            "connect_args": {"check_same_thread": False, "timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000},
+        }
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", 10),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        # Recycle before typical server/proxy idle timeouts close connections under us
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+    }
+
+
+def _read_url(url):
+    read_url = os.environ.get("DATABASE_READ_URL")
+    if read_url:
+        return read_url
+    parsed = make_url(url)
+    # A file-backed SQLite database gets its own pool of read-only connections
+    if parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:"):
+        return url
+    return None
+
+
+def _install_pragmas(engine, read_only):
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def init_database(app, db, url=None):
+    """Configure app for its database (DATABASE_URL by default) and register db with it."""
+    url = url or os.environ.get("DATABASE_URL", DEFAULT_URL)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(url)
+    read_url = _read_url(url)
+    if read_url:
+        app.config["SQLALCHEMY_BINDS"] = {READ_BIND: {"url": read_url, **engine_options(read_url)}}
+    db.init_app(app)
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == "sqlite":
+                _install_pragmas(engine, read_only=key == READ_BIND)
+
+
+def ensure_indexes(db):
+    """
+    Create indexes and unique constraints declared on the models that an existing database
+    doesn't have yet (create_all only adds them with new tables).
+    """
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+        if inspector.has_table(table.name):
+            _ensure_unique(db.engine, inspector, table)
+
+
+def _ensure_unique(engine, inspector, table):
+    covered = {frozenset(c["column_names"]) for c in inspector.get_unique_constraints(table.name)}
+    covered |= {frozenset(i["column_names"]) for i in inspector.get_indexes(table.name) if i["unique"]}
+    covered.add(frozenset(inspector.get_pk_constraint(table.name)["constrained_columns"]))
+    for constraint in table.constraints:
+        if not isinstance(constraint, UniqueConstraint) or not constraint.name:
+            continue
+        columns = list(constraint.columns)
+        if frozenset(column.name for column in columns) in covered:
+            continue
+        # Raw DDL: an Index object would attach itself to the model's table
+        quote = engine.dialect.identifier_preparer.quote
+        ddl = text(
+            f"CREATE UNIQUE INDEX {quote(constraint.name)} ON {quote(table.name)} "
+            f"({', '.join(quote(column.name) for column in columns)})"
+        )
+        try:
+            with engine.begin() as connection:
+                if len(columns) == len(table.columns):
+                    # Rows are nothing but the key (e.g. memberships), so duplicates are safe to merge
+                    _merge_duplicates(connection, table)
+                connection.execute(ddl)
+        except IntegrityError:
+            log.warning("%s has duplicate rows; %s was not created", table.name, constraint.name)
+
+
+def _merge_duplicates(connection, table):
+    columns = list(table.columns)
+    duplicates = connection.execute(select(*columns).group_by(*columns).having(func.count() > 1)).all()
+    for row in duplicates:
+        connection.execute(table.delete().where(and_(*(column == value for column, value in zip(columns, row)))))
+        connection.execute(table.insert().values(dict(row._mapping)))
+
+
+class RoutingSession(Session):
+    """
+    Session that runs plain SELECTs on the "read" bind (when configured) and everything
+    else on the primary. Once it has written anything it stays on the primary until it is
+    closed (the end of the request), so it always reads its own writes: that includes
+    reloading the attributes a commit expires, which a lagging replica may not have yet.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if (
+                isinstance(clause, Select)
+                and clause._for_update_arg is None
+                and not self._flushing
+                and not self.info.get("wrote")
+            ):
+                read_engine = self._db.engines.get(READ_BIND)
+                if read_engine is not None:
+                    return read_engine
+            else:
+                # Flushes, DML, bulk operations and raw SQL may all write
+                self.info["wrote"] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def close(self):
+        self.info.pop("wrote", None)
+        super().close()
+
+    def reset(self):
+        self.info.pop("wrote", None)
+        super().reset()
@@ -0,0 +1,95 @@
+"""
+Local stand-in for the Gemini generateContent API.
+
+Point the backend at it with GEMINI_BASE_URL=http://localhost:8765, or run this file directly
+to compare the shared client manager against building a new genai.Client per call.
+"""
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PORT = 8765
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    latency = 0.0  # seconds of simulated model time per request
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.latency:
+            time.sleep(self.latency)
+
+        if ":generateContent" not in self.path:
+            self.send_error(404)
+            return
+
+        request = json.loads(body or b"{}")
+        text = "What story in your group's topic surprised you most this week?"
+        payload = json.dumps({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+            }],
+            "usageMetadata": {
+                "promptTokenCount": len(json.dumps(request)) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(json.dumps(request)) + len(text)) // 4,
+            },
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port=PORT, latency=0.0):
+    """Start the fake server on a background thread and return it (call .shutdown() to stop)."""
+    handler = type("FakeGeminiHandler", (Handler,), {"latency": latency})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def compare(calls=200, port=PORT):
+    """Time `calls` requests through the shared manager and through a fresh client per call."""
+    import google.genai as genai
+    from google.genai import types
+
+    from backend.gemini_client import GeminiClientManager
+
+    base_url = f"http://127.0.0.1:{port}"
+    manager = GeminiClientManager(api_key="fake", base_url=base_url)
+
+    start_time = time.perf_counter()
+    for _ in range(calls):
+        manager.generate_content("ping")
+    shared = (time.perf_counter() - start_time) / calls
+
+    start_time = time.perf_counter()
+    for _ in range(calls):
+        client = genai.Client(api_key="fake", http_options=types.HttpOptions(base_url=base_url))
+        client.models.generate_content(model="gemini-3-flash-preview", contents="ping")
+    per_call = (time.perf_counter() - start_time) / calls
+
+    print(f"shared client:   {shared * 1000:.2f} ms/request")
+    print(f"client per call: {per_call * 1000:.2f} ms/request")
+    print(f"overhead saved:  {(per_call - shared) * 1000:.2f} ms/request")
+
+
+if __name__ == "__main__":
+    server = start()
+    try:
+        compare()
+    finally:
+        server.shutdown()
@@ -0,0 +1,149 @@
+"""
+Shared Gemini client with timeouts and retries.
+
+The google-genai SDK (and httpx under it) takes a noticeable share of a cold start to
+import, so it is only loaded when the first client is built, i.e. on the first prompt that
+actually needs generating rather than whenever the app starts.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+from backend import metrics
+
+DEFAULT_MODEL = "gemini-3-flash-preview"
+
+# Status codes worth retrying: rate limiting and transient server failures
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class GeminiClientManager:
+    """
+    Owns a single genai.Client for the whole process so its HTTP connection pool, auth and
+    config are set up once instead of on every prompt. Calls get a timeout and are retried
+    with exponential backoff (plus jitter) on rate limits, 5xx responses and network errors.
+    """
+
+    def __init__(self, api_key, base_url=None, timeout_ms=15000, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, max_connections=20):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout_ms = timeout_ms
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_connections = max_connections
+
+        self._client = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a manager from GEMINI_* environment variables."""
+        return cls(
+            api_key=os.environ.get("GEMINI_API_KEY") or None,
+            base_url=os.environ.get("GEMINI_BASE_URL") or None,
+            timeout_ms=int(os.environ.get("GEMINI_TIMEOUT_MS", "15000")),
+            max_retries=int(os.environ.get("GEMINI_MAX_RETRIES", "3")),
+            max_connections=int(os.environ.get("GEMINI_MAX_CONNECTIONS", "20")),
+        )
+
+    @property
+    def client(self):
+        """
+        The shared genai.Client, created on first use. Raises RuntimeError without an API key,
+        which callers treat like any other failed call (they fall back to the default prompt).
+        """
+        if self._client is None:
+            if not self.api_key:
+                raise RuntimeError("GEMINI_API_KEY is not set")
+            with self._lock:
+                if self._client is None:
+                    import google.genai as genai
+                    import httpx
+                    from google.genai import types
+
+                    limits = httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    )
+                    http_options = types.HttpOptions(
+                        base_url=self.base_url,
+                        timeout=self.timeout_ms,
+                        client_args={"limits": limits},
+                        async_client_args={"limits": limits},
+                    )
+                    self._client = genai.Client(api_key=self.api_key, http_options=http_options)
+        return self._client
+
+    def generate_content(self, contents, model=DEFAULT_MODEL, config=None):
+        """Call models.generate_content on the shared client, retrying transient failures."""
+        client = self.client
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = client.models.generate_content(model=model, contents=contents, config=config)
+            except Exception as e:
+                metrics.record_model_call(model, time.perf_counter() - started, error=e)
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                metrics.model_retries.inc(model=model)
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+            else:
+                metrics.record_model_call(model, time.perf_counter() - started, response=response)
+                return response
+
+    async def generate_content_async(self, contents, model=DEFAULT_MODEL, config=None):
+        """Async counterpart of generate_content, using the shared client's aio interface."""
+        # Building the client imports the SDK, which mustn't stall the event loop
+        client = self._client or await asyncio.to_thread(lambda: self.client)
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await client.aio.models.generate_content(model=model, contents=contents, config=config)
+            except Exception as e:
+                metrics.record_model_call(model, time.perf_counter() - started, error=e)
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                metrics.model_retries.inc(model=model)
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+            else:
+                metrics.record_model_call(model, time.perf_counter() - started, response=response)
+                return response
+
+    def close(self):
+        """Drop the shared client (and its connections); the next call builds a new one."""
+        with self._lock:
+            self._client = None
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _is_retryable(error):
+        import httpx
+        from google.genai import errors
+
+        if isinstance(error, errors.APIError):
+            return error.code in RETRYABLE_STATUS
+        return isinstance(error, httpx.TransportError)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_gemini():
+    """Return the process-wide Gemini client manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = GeminiClientManager.from_env()
+        return _manager
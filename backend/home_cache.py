@@ -0,0 +1,114 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+class HomeFeedCache:
+    """
+    Bounded LRU of each user's home page group list (User.get_joined_groups_data).
+    A reverse index from group id to the users whose cached list shows that group lets
+    a change to one group drop only the entries that display it.
+
+    Every invalidation bumps a generation number. A list built from a query that started
+    before an invalidation may already be stale, so put() drops it when given the
+    generation read before the query and that number has since changed.
+    """
+
+    def __init__(self, max_users=10000):
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._entries = OrderedDict()  # user_id -> list of group dicts
+        self._etags = {}  # user_id -> hash of the cached list, for HTTP revalidation
+        self._users_by_group = {}  # group_id -> set of user_ids
+
+    def get(self, user_id):
+        with self._lock:
+            groups = self._entries.get(user_id)
+            if groups is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return groups
+
+    def etag(self, user_id):
+        """Content hash of the user's cached list, or None if it isn't cached."""
+        with self._lock:
+            return self._etags.get(user_id)
+
+    def generation(self):
+        """Read before querying the database for a list that will be put()."""
+        with self._lock:
+            return self._generation
+
+    def put(self, user_id, groups, generation=None):
+        """Cache a user's list, unless an invalidation happened since `generation` was read."""
+        etag = hashlib.sha1(json.dumps(groups, sort_keys=True, default=str).encode()).hexdigest()[:20]
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._drop(user_id)
+            self._entries[user_id] = groups
+            self._etags[user_id] = etag
+            for group in groups:
+                self._users_by_group.setdefault(group['id'], set()).add(user_id)
+            while len(self._entries) > self.max_users:
+                self._drop(next(iter(self._entries)))
+            return True
+
+    def invalidate_users(self, user_ids):
+        """Forget the cached lists of users whose memberships changed."""
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                if self._drop(user_id):
+                    self.invalidations += 1
+
+    def invalidate_group(self, group_id):
+        """Forget every cached list that shows this group (edited, new posts, member count changed)."""
+        with self._lock:
+            self._generation += 1
+            for user_id in self._users_by_group.pop(group_id, ()):
+                if self._drop(user_id):
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._etags.clear()
+            self._users_by_group.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _drop(self, user_id):
+        groups = self._entries.pop(user_id, None)
+        if groups is None:
+            return False
+        self._etags.pop(user_id, None)
+        for group in groups:
+            users = self._users_by_group.get(group['id'])
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._users_by_group[group['id']]
+        return True
+
+
+home_feed_cache = HomeFeedCache()
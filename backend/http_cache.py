@@ -0,0 +1,106 @@
+"""
+HTTP caching helpers for the JSON API: validators (ETag / Last-Modified), Cache-Control,
+304 responses that skip serialization, and gzip/brotli compression of larger bodies.
+
+validators_match() and cache_headers() work on plain header values, so the ASGI server
+(backend/asgi.py) answers conditional requests exactly like the Flask routes.
+"""
+import gzip
+import hashlib
+from datetime import datetime, timezone
+
+from flask import Response, jsonify, request
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def validators_match(etag, last_modified, if_none_match, if_modified_since):
+    """True if If-None-Match / If-Modified-Since header values (or None) still match."""
+    if if_none_match:
+        # Compressed responses carry weak ETags, so compare weakly
+        return parse_etags(if_none_match).contains_weak(etag)
+    if last_modified is not None and if_modified_since:
+        since = parse_date(if_modified_since)
+        return since is not None and last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def is_not_modified(etag, last_modified=None):
+    """True if the current request's If-None-Match / If-Modified-Since validators still match."""
+    return validators_match(
+        etag, last_modified, request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")
+    )
+
+
+def cache_headers(etag, last_modified=None, max_age=0):
+    """ETag, Last-Modified and Cache-Control headers for a response, as a dict."""
+    max_age = max(0, int(max_age))
+    # Without a lifetime it may still be stored, but must be revalidated
+    headers = {
+        "ETag": quote_etag(etag),
+        "Cache-Control": f"public, max-age={max_age}" if max_age else "public, max-age=0, no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def conditional_json(build_payload, etag, last_modified=None, max_age=0):
+    """
+    Return a 304 when the client's copy is current, otherwise jsonify(build_payload()).
+    build_payload is only called when a body is actually needed.
+    """
+    if is_not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = jsonify(build_payload())
+    response.headers.update(cache_headers(etag, last_modified, max_age))
+    return response
+
+
+def epoch_to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def compress_response(response):
+    """after_request hook: gzip or brotli-encode larger JSON/text bodies the client accepts."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or not (response.mimetype == "application/json" or response.mimetype.startswith("text/"))
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        response.set_data(brotli.compress(body, quality=5))
+        response.headers["Content-Encoding"] = "br"
+    elif accepted.quality("gzip") > 0:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        return response
+
+    # The encoded bytes differ from the identity body, so the validator can only be weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def etag_for(*parts):
+    """Build an ETag from the values that determine a response (not from the response body)."""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
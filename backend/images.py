@@ -0,0 +1,140 @@
+"""
+Uploaded images (group thumbnails, profile pictures).
+
+Each upload is decoded once, resized to a few fixed widths and re-encoded as WebP and JPEG.
+Files are named by the SHA-256 of the uploaded bytes, so the same picture uploaded twice is
+stored once and its URLs never change (they can be cached forever). Clients get URLs back,
+never image data.
+
+Needs Pillow; without it uploads are rejected and images_available() is False.
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import uuid
+
+# Pillow is optional and only the upload endpoints need it, so it's imported on the first upload
+Image = ImageOps = None
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "uploads")
+
+# Widths every upload is resized to (never upscaled); clients pick one with srcset
+WIDTHS = (160, 320, 640, 1280)
+# Width used for the plain "url" of an image (thumbnails are shown at about this size)
+DEFAULT_WIDTH = 320
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+MAX_UPLOAD_BYTES = int(os.environ.get("IMAGE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Refuse decompression bombs long before they reach memory
+MAX_PIXELS = 40_000_000
+
+
+def images_available():
+    return Image is not None or importlib.util.find_spec("PIL") is not None
+
+
+def _load_pillow():
+    global Image, ImageOps
+    if Image is None:
+        from PIL import Image, ImageOps
+
+
+def store_path():
+    return os.environ.get("IMAGE_STORE_PATH", DEFAULT_PATH)
+
+
+def variant_name(digest, width, ext):
+    """Relative path of one stored variant, sharded by the first two hex digits."""
+    return f"{digest[:2]}/{digest}-{width}.{ext}"
+
+
+def _widths_for(original_width):
+    widths = [w for w in WIDTHS if w < original_width]
+    # Small images keep their own size as the largest variant
+    return widths + [min(original_width, WIDTHS[-1])]
+
+
+def _load(data):
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_PIXELS:
+            raise ValueError("image dimensions are too large")
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError("not a supported image") from e
+    # Respect camera rotation, then drop EXIF (and any location data) from every variant
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    return image
+
+
+def _flatten(image):
+    # JPEG has no alpha channel: composite onto white instead of letting it turn black
+    if image.mode != "RGBA":
+        return image
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def _describe(digest, widths, size):
+    return {
+        "id": digest,
+        "width": size[0],
+        "height": size[1],
+        "widths": widths,
+        "variants": {ext: {w: variant_name(digest, w, ext) for w in widths} for ext in FORMATS},
+    }
+
+
+def store_image(data):
+    """
+    Store an uploaded image's variants (once per distinct upload) and describe them.
+    Returns {"id", "width", "height", "widths", "variants": {ext: {width: relative path}}}.
+    Raises ValueError for files that aren't usable images and RuntimeError without Pillow.
+    """
+    if not images_available():
+        raise RuntimeError("image uploads require Pillow")
+    _load_pillow()
+
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise ValueError(f"image is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    root = store_path()
+    marker = os.path.join(root, digest[:2], f"{digest}.json")
+
+    # A repeat upload is answered from the marker without decoding anything
+    if os.path.exists(marker):
+        with open(marker) as f:
+            size = tuple(json.load(f)["size"])
+        return _describe(digest, _widths_for(size[0]), size)
+
+    image = _load(data)
+    widths = _widths_for(image.width)
+    os.makedirs(os.path.dirname(marker), exist_ok=True)
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for ext, (fmt, options) in FORMATS.items():
+            path = os.path.join(root, variant_name(digest, width, ext))
+            # Write then rename, so readers (and a concurrent identical upload) never see a partial file
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "wb") as f:
+                (resized if fmt == "WEBP" else _flatten(resized)).save(f, fmt, **options)
+            os.replace(tmp, path)
+    # Written last: its presence means every variant is complete
+    with open(marker, "w") as f:
+        json.dump({"size": image.size}, f)
+    return _describe(digest, widths, image.size)
+
+
+def pick_width(widths, wanted=DEFAULT_WIDTH):
+    """Smallest stored width at least as wide as wanted (or the largest there is)."""
+    return next((w for w in widths if w >= wanted), widths[-1])
@@ -0,0 +1,181 @@
+"""
+Live post updates for group pages, fanned out in-process.
+
+Post.create, Post.edit_content and Post.delete_all_in_group publish small events ("post",
+"edit", "clear") after they commit; backend/asgi.py streams them to each group's open pages
+as Server-Sent Events. Each event is encoded once and the same bytes go to every subscriber,
+and an idle subscriber is a coroutine waiting on an asyncio.Event, so thousands of open pages
+cost little.
+
+Groups nobody has opened a stream for are skipped, so a post made while no page is watching
+costs nothing here (the payload may be passed as a callable and is only built when needed).
+
+The last HISTORY events of each watched group are kept so a reconnecting client (EventSource sends
+Last-Event-ID on its own) receives what it missed. When that isn't possible (the events
+were dropped, the server restarted, or the client fell too far behind) it gets a "reset"
+event and should reload the list.
+
+Events only reach subscribers in the same process, so run a single worker when this is used.
+"""
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict, deque, namedtuple
+
+# Events kept per group for Last-Event-ID resume
+HISTORY = int(os.environ.get("LIVE_HISTORY", "256"))
+# Groups whose history is kept; the least recently active are forgotten first
+MAX_GROUPS = int(os.environ.get("LIVE_MAX_GROUPS", "10000"))
+# Events queued for one slow client before it is sent a "reset" and disconnected
+MAX_PENDING = int(os.environ.get("LIVE_MAX_PENDING", "100"))
+
+# seq: process-wide event number; prev: seq of the group's previous event; data: the SSE message
+Event = namedtuple("Event", "seq prev data")
+
+
+def encode_event(event_id, event_type, payload):
+    """One SSE message. json.dumps never emits newlines, so the data fits on one line."""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(payload)}\n\n".encode()
+
+
+class Subscription:
+    """One open stream. Events are handed over on the subscriber's event loop."""
+
+    def __init__(self, updates, group_id, loop):
+        self.group_id = group_id
+        self.reset = False  # the client must reload: its history is gone or it fell behind
+        self.closed = False
+        self._updates = updates
+        self._loop = loop
+        self._pending = deque()
+        self._wakeup = asyncio.Event()
+
+    def _deliver(self, event):
+        if self.closed or self.reset:
+            return
+        if len(self._pending) >= MAX_PENDING:
+            self.reset = True
+        else:
+            self._pending.append(event)
+        self._wakeup.set()
+
+    async def get(self, timeout=None):
+        """
+        The next encoded message, or None after timeout seconds without one (time for a
+        keepalive) or once the subscription is closed or reset.
+        """
+        while not self._pending and not (self.closed or self.reset):
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._pending.popleft().data if self._pending and not self.reset else None
+
+    def close(self):
+        """Stop the subscription; a waiting get() returns None."""
+        if not self.closed:
+            self.closed = True
+            self._updates._unsubscribe(self)
+            self._wakeup.set()
+
+
+class LiveUpdates:
+    """
+    Pub/sub of post events per group. publish() may be called from any thread (the Flask
+    request threads); subscribers live on an asyncio event loop.
+    """
+
+    def __init__(self, history=HISTORY, max_groups=MAX_GROUPS):
+        self.history = history
+        self.max_groups = max_groups
+        # Event ids are "<boot>-<seq>", so ids from before a restart are recognised as stale
+        self.boot = os.urandom(4).hex()
+
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._history = OrderedDict()  # group_id -> deque of Events, most recently active last
+        self._subscribers = {}  # group_id -> set of Subscriptions
+
+    def publish(self, group_id, event_type, payload):
+        """
+        Record an event for a group and hand it to the group's open streams. payload may be a
+        callable returning it; it is only called when the group has been subscribed to.
+        """
+        with self._lock:
+            watched = group_id in self._history or group_id in self._subscribers
+        if not watched:
+            return
+        if callable(payload):
+            payload = payload()
+        with self._lock:
+            self._seq += 1
+            events = self._group_history(group_id)
+            prev = events[-1].seq if events else 0
+            event = Event(self._seq, prev, encode_event(f"{self.boot}-{self._seq}", event_type, payload))
+            events.append(event)
+            # Scheduled while holding the lock, so every subscriber gets events in publish order
+            for subscription in self._subscribers.get(group_id, ()):
+                try:
+                    subscription._loop.call_soon_threadsafe(subscription._deliver, event)
+                except RuntimeError:  # its event loop has shut down
+                    pass
+
+    def subscribe(self, group_id, last_event_id=None):
+        """
+        Open a stream for a group; call from a coroutine. With last_event_id, the events
+        published since then are queued first, or the subscription starts reset when they
+        can't be replayed.
+        """
+        subscription = Subscription(self, group_id, asyncio.get_running_loop())
+        with self._lock:
+            if last_event_id:
+                missed = self._missed_since(group_id, last_event_id)
+                if missed is None:
+                    subscription.reset = True
+                else:
+                    subscription._pending.extend(missed)
+            # From now on the group's events are kept, for this client's reconnects
+            self._group_history(group_id)
+            self._subscribers.setdefault(group_id, set()).add(subscription)
+        return subscription
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def _group_history(self, group_id):
+        """The group's kept events, marked most recently active; call with the lock held."""
+        events = self._history.get(group_id)
+        if events is None:
+            events = self._history[group_id] = deque(maxlen=self.history)
+            while len(self._history) > self.max_groups:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(group_id)
+        return events
+
+    def _missed_since(self, group_id, last_event_id):
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        events = self._history.get(group_id, ())
+        missed = [event for event in events if event.seq > seq]
+        if missed:
+            # Replayable only if nothing between the client's event and the oldest kept one was dropped
+            return missed if missed[0].prev == seq else None
+        # Nothing newer: the client is current if it saw the group's latest event
+        return missed if events and events[-1].seq == seq else None
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.group_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.group_id]
+
+
+live_updates = LiveUpdates()
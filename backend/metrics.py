@@ -0,0 +1,296 @@
+"""
+In-process metrics in the Prometheus text format.
+
+- Flask hooks record per-route latency and per-request SQL query counts/time.
+- An engine listener records every SQL statement's duration.
+- GeminiClientManager reports model-call latency, retries and token usage.
+- Cache hit rates and open live streams are read at scrape time.
+
+GET /metrics serves it all. Set SLOW_REQUEST_MS to log requests slower than that,
+with their slowest SQL statements, to the "notable.slow" logger.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from flask import Response, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Unset (or 0) disables the slow-request log
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+# Statements shown per slow request, slowest first
+SLOW_QUERIES_SHOWN = 10
+
+slow_log = logging.getLogger("notable.slow")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # label values tuple -> value
+        registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _render_value(self, key, state):
+        counts, total = state
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ("le", bound))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value computed at scrape time by fn(), which returns {label values tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name, help, fn, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def render(self):
+        try:
+            values = dict(self.fn())
+        except Exception as e:  # a broken collector must not break the whole scrape
+            logging.getLogger(__name__).debug("gauge %s failed: %s", self.name, e)
+            values = {}
+        with self._lock:
+            self._values = values
+        return super().render()
+
+
+registry = []
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _prompt_cache_stats():
+    from backend.prompt_cache import get_prompt_cache
+    cache = get_prompt_cache()
+    return {"hits": cache.hits, "misses": cache.misses}
+
+
+def _home_cache_stats():
+    from backend.home_cache import home_feed_cache
+    stats = home_feed_cache.stats()
+    return {"hits": stats["hits"], "misses": stats["misses"], "invalidations": stats["invalidations"]}
+
+
+def _cache_lookups():
+    values = {}
+    for cache, stats in (("prompt", _prompt_cache_stats()), ("home", _home_cache_stats())):
+        for result in ("hits", "misses"):
+            values[(cache, result)] = stats[result]
+    return values
+
+
+def _cache_hit_ratio():
+    values = {}
+    for cache, stats in (("prompt", _prompt_cache_stats()), ("home", _home_cache_stats())):
+        lookups = stats["hits"] + stats["misses"]
+        values[(cache,)] = stats["hits"] / lookups if lookups else 0.0
+    return values
+
+
+def _live_connections():
+    from backend.live_updates import live_updates
+    return {(): live_updates.subscriber_count()}
+
+
+http_latency = Histogram(
+    "notable_http_request_duration_seconds", "Time to handle a request, by route.", ("method", "route", "status")
+)
+http_queries = Histogram(
+    "notable_http_request_queries", "SQL statements issued per request, by route.", ("route",), buckets=COUNT_BUCKETS
+)
+http_query_time = Histogram(
+    "notable_http_request_query_seconds", "Total SQL time per request, by route.", ("route",)
+)
+sql_latency = Histogram(
+    "notable_sql_query_duration_seconds", "Duration of each SQL statement, by kind.", ("operation",), buckets=QUERY_BUCKETS
+)
+model_latency = Histogram(
+    "notable_model_request_duration_seconds", "Duration of each Gemini call attempt.", ("model", "outcome")
+)
+model_retries = Counter("notable_model_retries_total", "Gemini calls retried after a transient failure.", ("model",))
+model_tokens = Counter("notable_model_tokens_total", "Tokens reported by Gemini usage metadata.", ("model", "kind"))
+prompt_fallbacks = Counter("notable_prompt_fallbacks_total", "Weekly prompts that fell back to the default question.")
+cache_lookups = Gauge("notable_cache_lookups", "Cache lookups by result.", _cache_lookups, ("cache", "result"))
+cache_hit_ratio = Gauge("notable_cache_hit_ratio", "Share of cache lookups that were hits.", _cache_hit_ratio, ("cache",))
+live_connections = Gauge("notable_live_connections", "Open live post streams.", _live_connections)
+
+
+# --- Model calls ---------------------------------------------------------------------------
+
+def record_model_call(model, seconds, response=None, error=None):
+    """Called by GeminiClientManager after each attempt."""
+    model_latency.observe(seconds, model=model, outcome="error" if error is not None else "ok")
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, field in (("prompt", "prompt_token_count"), ("output", "candidates_token_count"),
+                        ("total", "total_token_count")):
+        count = getattr(usage, field, None)
+        if count:
+            model_tokens.inc(count, model=model, kind=kind)
+
+
+# --- SQL -----------------------------------------------------------------------------------
+
+class _RequestStats:
+    def __init__(self, keep_statements):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements = [] if keep_statements else None
+
+
+_current = contextvars.ContextVar("notable_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("notable_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("notable_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    sql_latency.observe(elapsed, operation=statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "")
+
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append((elapsed, statement))
+
+
+def instrument_engine(engine):
+    """Time every statement run on engine (call once, inside an app context)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Flask ---------------------------------------------------------------------------------
+
+def _start_request():
+    request.environ["notable.metrics_token"] = _current.set(_RequestStats(keep_statements=SLOW_REQUEST_MS > 0))
+
+
+def _finish_request(response):
+    stats = _current.get()
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats.started
+    # The URL rule, not the path, keeps label cardinality bounded
+    route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+    http_latency.observe(elapsed, method=request.method, route=route, status=response.status_code)
+    http_queries.observe(stats.queries, route=route)
+    http_query_time.observe(stats.query_seconds, route=route)
+
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        slowest = sorted(stats.statements, key=lambda item: item[0], reverse=True)[:SLOW_QUERIES_SHOWN]
+        slow_log.warning(
+            "%s %s took %.1f ms (%d queries, %.1f ms in SQL)%s",
+            request.method, request.full_path.rstrip("?"), elapsed * 1000, stats.queries,
+            stats.query_seconds * 1000,
+            "".join(f"\n  {seconds * 1000:8.2f} ms  {' '.join(sql.split())}" for seconds, sql in slowest),
+        )
+    return response
+
+
+def _reset_request(exc=None):
+    token = request.environ.pop("notable.metrics_token", None)
+    if token is not None:
+        _current.reset(token)
+
+
+def metrics_endpoint():
+    return Response(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def init_metrics(app, engines):
+    """Instrument a Flask app and its engines, and serve GET /metrics."""
+    for engine in engines:
+        instrument_engine(engine)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_reset_request)
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint)
@@ -0,0 +1,125 @@
+"""
+Password hashing off the request thread.
+
+Hashes are computed in a small process pool, so a burst of logins uses at most
+PASSWORD_HASH_WORKERS cores and never holds the GIL the API threads need. The algorithm and
+cost come from PASSWORD_HASH_METHOD (any werkzeug method string, ex: "scrypt:32768:8:1" or
+"pbkdf2:sha256:600000"); hashes made with other settings still verify and are upgraded on
+the next successful login.
+
+PASSWORD_HASH_WORKERS=0 hashes inline, which is handy for tests and scripts.
+
+Workers are started with forkserver (spawn where that isn't available), never fork: the
+pool is created inside a server that already runs threads, and a forked child could inherit
+a lock one of them held (logging, the connection pool, metrics) and hang on it.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+METHOD = os.environ.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+# Leave at least half the cores to the rest of the API by default
+WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Hashes queued or running at once; further callers wait up to QUEUE_TIMEOUT seconds
+MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", str(max(1, WORKERS) * 8)))
+QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", "10"))
+
+
+class HashingBusy(RuntimeError):
+    """Raised when too many hashes are already queued; the API answers 503 with Retry-After."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(MAX_PENDING)
+_method_prefix = {}
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context(start_method))
+        return _pool
+
+
+def _run(fn, *args):
+    if WORKERS <= 0:
+        return fn(*args)
+    if not _pending.acquire(timeout=QUEUE_TIMEOUT):
+        raise HashingBusy("too many password hashes in progress")
+    try:
+        return _executor().submit(fn, *args).result()
+    finally:
+        _pending.release()
+
+
+def hash_password(raw_password, method=None):
+    """Hash a password with the configured (or given) method, in the pool."""
+    return _run(generate_password_hash, raw_password, method or METHOD)
+
+
+def verify_password(password_hash, raw_password):
+    """Check a password against a stored hash, in the pool."""
+    if not password_hash or raw_password is None:
+        return False
+    return _run(check_password_hash, password_hash, raw_password)
+
+
+def method_prefix(method=None):
+    """
+    The "method" part of hashes made with a werkzeug method string, with werkzeug's
+    defaults filled in (ex: "scrypt" -> "scrypt:32768:8:1").
+    """
+    method = method or METHOD
+    if method not in _method_prefix:
+        # Hashing a throwaway value is the one way to learn werkzeug's expanded parameters
+        _method_prefix[method] = _run(generate_password_hash, "", method).split("$", 1)[0]
+    return _method_prefix[method]
+
+
+def needs_rehash(password_hash):
+    """True if a hash was made with a different algorithm or cost than the configured one."""
+    return bool(password_hash) and password_hash.split("$", 1)[0] != method_prefix()
+
+
+def verify_and_update(password_hash, raw_password):
+    """
+    Check a password; returns (matches, new_hash). new_hash is a replacement made with the
+    current settings when the password matched an outdated hash, otherwise None.
+    """
+    if not verify_password(password_hash, raw_password):
+        return False, None
+    if needs_rehash(password_hash):
+        return True, hash_password(raw_password)
+    return True, None
+
+
+def configure(method=None, workers=None, max_pending=None):
+    """Change the hashing settings at runtime; the pool restarts with the new worker count."""
+    global METHOD, WORKERS, MAX_PENDING, _pending
+    shutdown()
+    if method is not None:
+        METHOD = method
+    if workers is not None:
+        WORKERS = workers
+    if max_pending is not None:
+        MAX_PENDING = max_pending
+    elif workers is not None:
+        MAX_PENDING = max(1, workers) * 8
+    _pending = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def shutdown():
+    """Stop the worker processes (a later call starts a new pool)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,144 @@
+"""
+Bulk post ingestion, for migrating saved posts or importing archives.
+
+Usage (from the repo root): python backend/post_import.py posts.jsonl [--batch-size 1000]
+Each line is a JSON object with content, user_id, group_id and optionally title and timestamp.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.home_cache import home_feed_cache
+from module import db, chunked, NewsGroup, Post, User
+
+
+def iter_jsonl(path):
+    """
+    Yield one dict per non-empty line, reading the file lazily. A line that isn't valid
+    JSON yields None, which ingest_posts counts as skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+
+
+def _parse_timestamp(value):
+    timestamp = datetime.fromisoformat(value)
+    # Post.timestamp holds naive UTC (datetime.utcnow), so convert offsets rather than drop them
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def _existing_ids(model, ids, known):
+    # Only ask the database about ids we haven't already confirmed
+    unknown = ids - known
+    for chunk in chunked(unknown):
+        known.update(row[0] for row in db.session.query(model.id).filter(model.id.in_(chunk)))
+    return known
+
+
+def _to_mapping(row):
+    if not isinstance(row, dict):
+        return None
+    content = str(row.get("content") or "").strip()
+    if not content or row.get("user_id") is None or row.get("group_id") is None:
+        return None
+    timestamp = row.get("timestamp")
+    return {
+        "title": (str(row.get("title") or "").strip() or content[:60])[:200],
+        "content": content,
+        "user_id": int(row["user_id"]),
+        "group_id": int(row["group_id"]),
+        "timestamp": _parse_timestamp(timestamp) if timestamp else datetime.utcnow(),
+    }
+
+
+def ingest_posts(rows, batch_size=1000, batches_per_commit=10):
+    """
+    Insert posts from any iterable of dicts, batch_size rows per INSERT and one commit per
+    batches_per_commit batches. Rows with missing fields or unknown users/groups are skipped.
+    Must be called inside an app context. Returns a dict of counts and rows per second.
+    """
+    started = time.perf_counter()
+    known_users, known_groups = set(), set()
+    group_table = NewsGroup.__table__
+    bump_post_count = group_table.update().where(group_table.c.id == db.bindparam("gid")).values(
+        post_count=group_table.c.post_count + db.bindparam("added")
+    )
+
+    inserted = skipped = batches = 0
+    touched_groups = set()
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+
+        mappings = []
+        for row in batch:
+            try:
+                mapping = _to_mapping(row)
+            except (TypeError, ValueError):
+                mapping = None
+            if mapping is None:
+                skipped += 1
+            else:
+                mappings.append(mapping)
+
+        _existing_ids(User, {m["user_id"] for m in mappings}, known_users)
+        _existing_ids(NewsGroup, {m["group_id"] for m in mappings}, known_groups)
+        valid = [m for m in mappings if m["user_id"] in known_users and m["group_id"] in known_groups]
+        skipped += len(mappings) - len(valid)
+
+        if valid:
+            db.session.bulk_insert_mappings(Post, valid)
+            per_group = {}
+            for m in valid:
+                per_group[m["group_id"]] = per_group.get(m["group_id"], 0) + 1
+            db.session.execute(bump_post_count, [{"gid": gid, "added": n} for gid, n in per_group.items()])
+            inserted += len(valid)
+            touched_groups.update(per_group)
+
+        batches += 1
+        if batches % batches_per_commit == 0:
+            db.session.commit()
+    db.session.commit()
+    for group_id in touched_groups:
+        home_feed_cache.invalidate_group(group_id)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "inserted": inserted,
+        "skipped": skipped,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(inserted / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import posts from a JSONL file.")
+    parser.add_argument("path", help="JSONL file, one post per line")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--batches-per-commit", type=int, default=10)
+    args = parser.parse_args()
+
+    from backend.app import app
+    with app.app_context():
+        stats = ingest_posts(iter_jsonl(args.path), args.batch_size, args.batches_per_commit)
+    print(f"Inserted {stats['inserted']} posts, skipped {stats['skipped']} "
+          f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "prompt_cache.db")
+
+# A cached prompt plus what HTTP revalidation needs: a content hash and epoch timestamps
+PromptEntry = namedtuple("PromptEntry", ["prompt", "etag", "created_at", "expires_at"])
+
+
+def _entry(prompt, created_at, expires_at):
+    etag = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:20]
+    return PromptEntry(prompt, etag, created_at, expires_at)
+
+
+def iso_week(day=None):
+    """Return the ISO week label (ex: "2026-W42") for a date, defaulting to today (UTC)."""
+    year, week, _ = (day or datetime.utcnow().date()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def week_end(week):
+    """Return the UTC datetime at which an ISO week label (ex: "2026-W42") rolls over."""
+    year, number = week.split("-W")
+    monday = datetime.strptime(f"{year}-W{int(number):02d}-1", "%G-W%V-%u")
+    return monday + timedelta(days=7)
+
+
+def prompt_key(group_name, category, week=None):
+    """Build the cache key for a group's question of the week."""
+    return (
+        group_name.strip().lower(),
+        category.strip().lower(),
+        week or iso_week(),
+    )
+
+
+class PromptCache:
+    """
+    SQLite-backed cache of weekly prompts with an in-memory LRU in front of it.
+    Entries survive restarts, expire when their ISO week rolls over (or after an explicit ttl),
+    and the table is bounded to max_entries rows by evicting the oldest prompts first.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=10000, memory_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> PromptEntry
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS prompts (
+                group_name TEXT NOT NULL,
+                category TEXT NOT NULL,
+                week TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (group_name, category, week)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_prompts_created_at ON prompts (created_at)")
+        self._size = self._conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+
+    def get(self, key):
+        """Return the cached prompt for key, or None if it is missing or expired."""
+        entry = self.get_entry(key)
+        return entry.prompt if entry else None
+
+    def get_entry(self, key):
+        """Return the cached PromptEntry for key, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT prompt, created_at, expires_at FROM prompts"
+                " WHERE group_name = ? AND category = ? AND week = ? AND expires_at > ?",
+                (*key, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            entry = self._remember(key, _entry(*row))
+            self.hits += 1
+            return entry
+
+    def set(self, key, prompt, ttl=None):
+        """
+        Store a prompt and return its PromptEntry.
+        Without a ttl (seconds) it lives until its ISO week rolls over.
+        """
+        now = time.time()
+        if ttl is None:
+            expires_at = (week_end(key[2]) - datetime(1970, 1, 1)).total_seconds()
+        else:
+            expires_at = now + ttl
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO prompts (group_name, category, week, prompt, created_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, prompt, now, expires_at),
+            )
+            # INSERT OR REPLACE reports a change for new and replaced rows alike, so _size is
+            # only an upper bound; _evict recounts before deleting anything.
+            if cursor.rowcount and key not in self._memory:
+                self._size += 1
+            entry = self._remember(key, _entry(prompt, now, expires_at))
+            if self._size > self.max_entries:
+                self._evict(now)
+            return entry
+
+    def clear(self):
+        """Drop every cached prompt."""
+        with self._lock:
+            self._conn.execute("DELETE FROM prompts")
+            self._memory.clear()
+            self._size = 0
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+        return entry
+
+    def _evict(self, now):
+        # Expired rows go first, then the oldest prompts until we are 10% under the bound.
+        self._conn.execute("DELETE FROM prompts WHERE expires_at <= ?", (now,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0] - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM prompts WHERE rowid IN (SELECT rowid FROM prompts ORDER BY created_at LIMIT ?)",
+                (excess,),
+            )
+        self._size = self._conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+        self._memory = OrderedDict(
+            (key, entry) for key, entry in self._memory.items() if entry.expires_at > now
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    """Return the process-wide prompt cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PromptCache(
+                path=os.environ.get("PROMPT_CACHE_PATH", DEFAULT_PATH),
+                max_entries=int(os.environ.get("PROMPT_CACHE_MAX_ENTRIES", "10000")),
+            )
+        return _cache
@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from backend.home_cache import home_feed_cache
+from backend.prompt_cache import get_prompt_cache, iso_week, prompt_key, week_end
+from backend.weekly_prompt import BATCH_SIZE, get_weekly_prompts
+from module import db, NewsGroup
+
+log = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by worker threads: at most `rate` calls per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _iter_groups(page_size):
+    """Yield (id, name, category) for every group, one keyset page at a time."""
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(NewsGroup.id, NewsGroup.name, NewsGroup.category)
+            .filter(NewsGroup.id > last_id)
+            .order_by(NewsGroup.id)
+            .limit(page_size)
+            .all()
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _warm(limiter, groups, week, batch_size):
+    get_weekly_prompts(groups, week, batch_size, limiter=limiter)
+
+
+def pregenerate_prompts(week=None, max_workers=4, rate=2.0, page_size=500, batch_size=BATCH_SIZE):
+    """
+    Generate the prompt of every group for an ISO week and store it in the prompt cache.
+    Groups without a cached prompt are sent to Gemini batch_size at a time, on at most
+    max_workers threads and at most `rate` calls per second (per-group retries included).
+    Must be called inside an app context. Returns the number of groups processed.
+    """
+    week = week or iso_week()
+    cache = get_prompt_cache()
+    limiter = RateLimiter(rate, burst=max_workers)
+    processed = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for rows in _iter_groups(page_size):
+            missing = [
+                (row.name, row.category or "General")
+                for row in rows
+                if cache.get(prompt_key(row.name, row.category or "General", week)) is None
+            ]
+            futures = [
+                pool.submit(_warm, limiter, missing[start:start + batch_size], week, batch_size)
+                for start in range(0, len(missing), batch_size)
+            ]
+            for future in futures:
+                future.result()
+            processed += len(rows)
+    return processed
+
+
+def publish_prompts(week=None, batch_size=200, page_size=500, rate=2.0):
+    """
+    Copy each group's cached prompt for the week into NewsGroup.prompt_of_the_week,
+    committing every batch_size rows. Prompts still missing are generated at most `rate`
+    Gemini calls per second. Must be called inside an app context.
+    """
+    week = week or iso_week()
+    limiter = RateLimiter(rate)
+    mappings = []
+    published = 0
+
+    for rows in _iter_groups(page_size):
+        # Normally all cache hits; anything still missing is generated in batches
+        prompts = get_weekly_prompts([(row.name, row.category or "General") for row in rows], week, limiter=limiter)
+        for row in rows:
+            prompt = prompts[(row.name, row.category or "General")]
+            mappings.append({"id": row.id, "prompt_of_the_week": prompt})
+            if len(mappings) >= batch_size:
+                published += _flush(mappings)
+    published += _flush(mappings)
+    # Every group's prompt changed, so every cached home page is stale
+    home_feed_cache.clear()
+    return published
+
+
+def _flush(mappings):
+    if not mappings:
+        return 0
+    db.session.bulk_update_mappings(NewsGroup, mappings)
+    db.session.commit()
+    count = len(mappings)
+    mappings.clear()
+    return count
+
+
+class PromptScheduler(threading.Thread):
+    """
+    Background thread that pre-generates next week's prompts `lead` before the ISO week
+    rolls over, then publishes them to the database once the new week starts.
+    """
+
+    def __init__(self, app, lead=timedelta(hours=6), max_workers=4, rate=2.0):
+        super().__init__(daemon=True, name="prompt-scheduler")
+        self.app = app
+        self.lead = lead
+        self.max_workers = max_workers
+        self.rate = rate
+        self._halt = threading.Event()
+
+    def run(self):
+        # Make sure the current week is covered when the process starts mid-week
+        self._run_step(self._pregenerate, iso_week())
+        self._run_step(self._publish, iso_week())
+
+        while not self._halt.is_set():
+            now = datetime.utcnow()
+            rollover = week_end(iso_week(now.date()))
+            next_week = iso_week(rollover.date())
+
+            if not self._wait_until(rollover - self.lead):
+                return
+            self._run_step(self._pregenerate, next_week)
+
+            if not self._wait_until(rollover):
+                return
+            self._run_step(self._publish, next_week)
+
+    def stop(self):
+        self._halt.set()
+
+    def _wait_until(self, when):
+        delay = (when - datetime.utcnow()).total_seconds()
+        return not self._halt.wait(max(0.0, delay))
+
+    def _run_step(self, step, week):
+        try:
+            with self.app.app_context():
+                step(week)
+        except Exception:
+            log.exception("Prompt scheduler failed for %s", week)
+
+    def _pregenerate(self, week):
+        count = pregenerate_prompts(week, max_workers=self.max_workers, rate=self.rate)
+        log.info("Pre-generated prompts for %d groups (%s)", count, week)
+
+    def _publish(self, week):
+        count = publish_prompts(week, rate=self.rate)
+        log.info("Published prompts for %d groups (%s)", count, week)
@@ -0,0 +1,150 @@
+"""
+Full-text search over posts and groups, backed by SQLite FTS5.
+
+The post_fts and news_group_fts tables are external-content indexes over the post and
+news_group tables. Triggers keep them in sync on every insert, update and delete, including
+bulk deletes and imports that bypass the ORM.
+"""
+import html
+import re
+
+from sqlalchemy.orm import joinedload
+
+from module import db, NewsGroup, Post
+
+# Largest page of search results a client may ask for
+MAX_PER_PAGE = 50
+
+# snippet() brackets matches with these; the rest of the snippet is escaped before they become <mark> tags
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+    "title, content, content='post', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_insert AFTER INSERT ON post BEGIN"
+    " INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_delete AFTER DELETE ON post BEGIN"
+    " INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_update AFTER UPDATE OF title, content ON post BEGIN"
+    " INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);"
+    " INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+
+    "CREATE VIRTUAL TABLE IF NOT EXISTS news_group_fts USING fts5("
+    "name, category, content='news_group', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS news_group_fts_insert AFTER INSERT ON news_group BEGIN"
+    " INSERT INTO news_group_fts(rowid, name, category) VALUES (new.id, new.name, new.category); END",
+    "CREATE TRIGGER IF NOT EXISTS news_group_fts_delete AFTER DELETE ON news_group BEGIN"
+    " INSERT INTO news_group_fts(news_group_fts, rowid, name, category) VALUES ('delete', old.id, old.name, old.category); END",
+    "CREATE TRIGGER IF NOT EXISTS news_group_fts_update AFTER UPDATE OF name, category ON news_group BEGIN"
+    " INSERT INTO news_group_fts(news_group_fts, rowid, name, category) VALUES ('delete', old.id, old.name, old.category);"
+    " INSERT INTO news_group_fts(rowid, name, category) VALUES (new.id, new.name, new.category); END",
+]
+
+
+def search_available():
+    return db.engine.dialect.name == "sqlite"
+
+
+def init_search():
+    """
+    Create the FTS tables and triggers if needed (call after db.create_all()).
+    Indexes built for the first time are filled from the existing rows.
+    Returns False when the database isn't SQLite, where search is unavailable.
+    """
+    if not search_available():
+        return False
+
+    existing = {
+        row[0] for row in db.session.execute(db.text(
+            "SELECT name FROM sqlite_master WHERE name IN ('post_fts', 'news_group_fts')"
+        ))
+    }
+    for statement in _SCHEMA:
+        db.session.execute(db.text(statement))
+    if "post_fts" not in existing or "news_group_fts" not in existing:
+        rebuild_search_index()
+    db.session.commit()
+    return True
+
+
+def rebuild_search_index():
+    """Re-index every post and group from the source tables."""
+    db.session.execute(db.text("INSERT INTO post_fts(post_fts) VALUES ('rebuild')"))
+    db.session.execute(db.text("INSERT INTO news_group_fts(news_group_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def to_match_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last one as a prefix
+    (so results show up while typing). Returns None if there is nothing to search for.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight(snippet):
+    """HTML-escape a snippet of user-written text, then mark its matches with <mark> tags."""
+    return html.escape(snippet).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def search_posts(text, page=1, per_page=20):
+    """
+    Ranked post search. Returns (results, has_more), where each result is Post.to_dict()
+    plus the group id, an HTML snippet (escaped, matches in <mark>) and its bm25 score
+    (lower is better).
+    """
+    match = to_match_query(text)
+    if match is None:
+        return [], False
+
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    rows = db.session.execute(db.text(
+        "SELECT rowid, bm25(post_fts, 2.0, 1.0) AS score,"
+        " snippet(post_fts, 1, :mark_start, :mark_end, '…', 16) AS snippet"
+        " FROM post_fts WHERE post_fts MATCH :match"
+        " ORDER BY score LIMIT :limit OFFSET :offset"
+    ), {
+        "match": match, "mark_start": _MARK_START, "mark_end": _MARK_END,
+        "limit": per_page + 1, "offset": (max(page, 1) - 1) * per_page,
+    }).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = {
+        post.id: post
+        for post in Post.query.options(joinedload(Post.author)).filter(Post.id.in_([row.rowid for row in rows]))
+    }
+
+    results = []
+    for row in rows:
+        post = posts.get(row.rowid)
+        if post is None:
+            continue
+        result = post.to_dict()
+        result.update(group_id=post.group_id, snippet=highlight(row.snippet), score=row.score)
+        results.append(result)
+    return results, has_more
+
+
+def search_groups(text, page=1, per_page=20):
+    """Ranked group search by name and category. Returns (results, has_more)."""
+    match = to_match_query(text)
+    if match is None:
+        return [], False
+
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    rows = db.session.execute(db.text(
+        "SELECT rowid, bm25(news_group_fts, 3.0, 1.0) AS score"
+        " FROM news_group_fts WHERE news_group_fts MATCH :match"
+        " ORDER BY score LIMIT :limit OFFSET :offset"
+    ), {"match": match, "limit": per_page + 1, "offset": (max(page, 1) - 1) * per_page}).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    groups = {group.id: group for group in NewsGroup.query.filter(NewsGroup.id.in_([row.rowid for row in rows]))}
+    return [groups[row.rowid].to_dict() for row in rows if row.rowid in groups], has_more
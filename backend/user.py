@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask import request
 from module import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from backend.passwords import hash_password, verify_and_update
 
 class User:
     def __init__(self, username: str, email: str, password_hash: str, pfp='default.jpg'):
@@ -20,7 +20,7 @@ class User:
         password = request.form.get('password', '')
         id = request.form.get('id', None)  # for updating existing users
         # encrypt password  
-        hashed_password = generate_password_hash(password)
+        hashed_password = hash_password(password)
         
         user = cls(username=username, email=email, password_hash=hashed_password)
         user.id = id  # Set the ID if it exists (for updating existing users)
@@ -30,10 +30,13 @@ class User:
     def set_password(self, raw_password):
         if not raw_password:
             raise ValueError("Password required")
-        self.password_hash = generate_password_hash(raw_password)
+        self.password_hash = hash_password(raw_password)
 
     def check_password(self, raw_password):
-        return check_password_hash(self.password_hash, raw_password)
+        matches, new_hash = verify_and_update(self.password_hash, raw_password)
+        if new_hash:
+            self.password_hash = new_hash
+        return matches
 
     # Not implemented yet...
     def change_password(self, old_pw, new_pw):
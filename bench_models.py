@@ -0,0 +1,271 @@
+"""
+Benchmarks for the model layer and the JSON API.
+
+Seeds a fresh database with synthetic users, groups, memberships and posts at a chosen
+scale, then times each operation (median / p95 / min over several runs) and counts the
+SQL statements it issues. The weekly prompt endpoint talks to backend/fake_gemini.py, so
+its cold (cache miss) case measures our overhead around a model call, never the model. Results are written as JSON; given a baseline from an earlier
+run, the script exits non-zero when anything got slower or issues more queries.
+
+Usage (from the repo root):
+    python bench_models.py --scale 10k --output bench-10k.json
+    python bench_models.py --scale 10k --baseline bench-10k.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from query_counter import count_queries
+
+SCALES = {
+    "1k": {"users": 100, "groups": 20, "groups_per_user": 5, "posts": 1_000},
+    "10k": {"users": 1_000, "groups": 100, "groups_per_user": 10, "posts": 10_000},
+    "100k": {"users": 10_000, "groups": 500, "groups_per_user": 10, "posts": 100_000},
+    "1m": {"users": 50_000, "groups": 2_000, "groups_per_user": 20, "posts": 1_000_000},
+}
+
+CATEGORIES = ["General", "Tech", "Fitness", "Books", "Music", "Travel", "Food", "Gaming"]
+WORDS = (
+    "today I learned something new about the way we work together and what makes a good week "
+    "reading running coding cooking music travel friends family coffee project garden weekend"
+).split()
+
+# Rows per INSERT while seeding
+SEED_CHUNK = 10_000
+
+
+def _text(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def seed(db, counts, rng):
+    """Fill an empty database. Ids are assigned in insertion order, starting at 1."""
+    from module import NewsGroup, Post, User, user_group_association
+
+    db.session.execute(User.__table__.insert(), [
+        {"username": f"bench{i}", "email": f"bench{i}@example.com", "pfp": "default.jpg"}
+        for i in range(counts["users"])
+    ])
+    db.session.execute(NewsGroup.__table__.insert(), [
+        {"name": f"Bench group {i}", "category": CATEGORIES[i % len(CATEGORIES)], "member_count": 0, "post_count": 0}
+        for i in range(counts["groups"])
+    ])
+
+    per_user = min(counts["groups_per_user"], counts["groups"])
+    memberships = [
+        {"user_id": user_id, "group_id": group_id}
+        for user_id in range(1, counts["users"] + 1)
+        for group_id in rng.sample(range(1, counts["groups"] + 1), per_user)
+    ]
+    for start in range(0, len(memberships), SEED_CHUNK):
+        db.session.execute(user_group_association.insert(), memberships[start:start + SEED_CHUNK])
+
+    # A few busy groups and many quiet ones, like real traffic
+    weights = [1 / (rank + 1) for rank in range(counts["groups"])]
+    started = datetime(2026, 1, 1)
+    for start in range(0, counts["posts"], SEED_CHUNK):
+        size = min(SEED_CHUNK, counts["posts"] - start)
+        group_ids = rng.choices(range(1, counts["groups"] + 1), weights=weights, k=size)
+        db.session.execute(Post.__table__.insert(), [
+            {
+                "title": _text(rng, 5),
+                "content": _text(rng, 30),
+                "timestamp": started + timedelta(seconds=start + i),
+                "user_id": rng.randint(1, counts["users"]),
+                "group_id": group_ids[i],
+            }
+            for i in range(size)
+        ])
+        db.session.commit()
+
+    NewsGroup.reconcile_counts()
+
+
+def measure(db, fn, repeat, setup=None):
+    """Time fn() repeat times; setup() runs before each call, outside the timing."""
+    timings, queries = [], []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with count_queries(db.engines.values()) as counter:
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "min_ms": round(timings[0], 3),
+        "queries": max(queries),
+    }
+
+
+def run_benchmarks(app, db, repeat, rng):
+    from backend.home_cache import home_feed_cache
+    from backend.prompt_cache import get_prompt_cache
+    from backend.search import search_available
+    from module import NewsGroup, Post, User, user_group_association
+
+    client = app.test_client()
+    results = {}
+
+    def bench(name, fn, setup=None):
+        results[name] = measure(db, fn, repeat, setup)
+        print(f"  {name:<32} {results[name]['median_ms']:>10.3f} ms  {results[name]['queries']:>4} queries")
+
+    def cold():
+        db.session.expire_all()
+
+    def cold_cache():
+        db.session.expire_all()
+        home_feed_cache.clear()
+
+    def cold_prompt():
+        get_prompt_cache().clear()
+
+    group = NewsGroup.query.order_by(NewsGroup.post_count.desc()).first()
+    user = User.query.get(1)
+    members = {row.user_id for row in db.session.query(user_group_association.c.user_id).filter_by(group_id=group.id)}
+    joiners = iter([u for u in User.query.limit(len(members) + repeat) if u.id not in members])
+
+    # Model layer
+    bench("NewsGroup.to_dict", lambda: group.to_dict(), cold)
+    bench("NewsGroup.to_dict(posts,members)", lambda: group.to_dict(include_members=True, include_posts=True), cold)
+    bench("NewsGroup.get_all_posts", lambda: group.get_all_posts(), cold)
+    bench("NewsGroup.get_feed", lambda: group.get_feed(), cold)
+
+    joined = []
+    def join():
+        joiner = next(joiners)
+        joined.append(joiner.id)
+        group.add_member(joiner)
+    bench("NewsGroup.add_member", join)
+    group.remove_members(joined)
+
+    bench("User.get_joined_groups_data", lambda: user.get_joined_groups_data(), cold_cache)
+    bench("User.get_joined_groups_data(warm)", lambda: user.get_joined_groups_data())
+    bench("Post.create", lambda: Post.create(
+        title=_text(rng, 5), content=_text(rng, 30), user_id=user.id, group_id=group.id
+    ))
+
+    # HTTP layer
+    first_page = client.get(f"/api/groups/{group.id}/posts").get_json()
+    bench("GET /api/groups/<id>/posts", lambda: client.get(f"/api/groups/{group.id}/posts"), cold)
+    if first_page.get("next_cursor"):
+        bench("GET /api/groups/<id>/posts?cursor", lambda: client.get(
+            f"/api/groups/{group.id}/posts", query_string={"cursor": first_page["next_cursor"]}
+        ), cold)
+    bench("GET /api/users/<id>/groups", lambda: client.get(f"/api/users/{user.id}/groups"), cold_cache)
+    bench("POST /api/groups/<id>/posts", lambda: client.post(
+        f"/api/groups/{group.id}/posts", json={"content": _text(rng, 30), "user_id": user.id}
+    ))
+    if search_available():
+        bench("GET /api/search", lambda: client.get("/api/search", query_string={"q": "coffee proj"}), cold)
+
+    prompt_query = {"groupName": group.name, "category": group.category}
+    bench("GET /api/weekly-prompt(cold)", lambda: client.get("/api/weekly-prompt", query_string=prompt_query), cold_prompt)
+    prompt = client.get("/api/weekly-prompt", query_string=prompt_query)
+    bench("GET /api/weekly-prompt(warm)", lambda: client.get("/api/weekly-prompt", query_string=prompt_query))
+    bench("GET /api/weekly-prompt(304)", lambda: client.get(
+        "/api/weekly-prompt", query_string=prompt_query, headers={"If-None-Match": prompt.headers["ETag"]}
+    ))
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """List regressions: more queries, or a median slower than the baseline allows."""
+    failures = []
+    if baseline.get("counts") != results["counts"]:
+        print("  ! baseline was recorded at a different scale; timings may not be comparable")
+    for name, before in baseline.get("results", {}).items():
+        after = results["results"].get(name)
+        if after is None:
+            continue
+        if after["queries"] > before["queries"]:
+            failures.append(f"{name}: {before['queries']} -> {after['queries']} queries")
+        allowed = max(before["median_ms"] * (1 + tolerance), before["median_ms"] + min_delta_ms)
+        if after["median_ms"] > allowed:
+            failures.append(f"{name}: median {before['median_ms']} -> {after['median_ms']} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the model layer and JSON API.")
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    for field in ("users", "groups", "groups_per_user", "posts"):
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, help=f"override the scale's {field}")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per operation")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the synthetic data")
+    parser.add_argument("--database", help="SQLAlchemy URL of an empty database (default: a temporary SQLite file)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown of a median (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="slowdowns below this are treated as noise")
+    args = parser.parse_args()
+
+    counts = dict(SCALES[args.scale])
+    for field in counts:
+        if getattr(args, field) is not None:
+            counts[field] = getattr(args, field)
+
+    workdir = tempfile.mkdtemp(prefix="notable-bench-")
+    # create_app() reads these
+    os.environ["DATABASE_URL"] = args.database or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("PROMPT_CACHE_PATH", os.path.join(workdir, "prompt_cache.db"))
+    # Prompt misses go to a local fake model, never to the real API
+    from backend import fake_gemini
+    gemini = fake_gemini.start(port=0)
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{gemini.server_port}"
+    os.environ["GEMINI_API_KEY"] = "fake"
+    from backend.app import app
+    from module import db
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        print(f"Seeding {counts} ...")
+        started = time.perf_counter()
+        seed(db, counts, rng)
+        seed_seconds = round(time.perf_counter() - started, 2)
+        print(f"Seeded in {seed_seconds}s\n")
+        results = {
+            "scale": args.scale,
+            "counts": counts,
+            "repeat": args.repeat,
+            "seed_seconds": seed_seconds,
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "database": db.engine.dialect.name,
+            },
+            "results": run_benchmarks(app, db, args.repeat, rng),
+        }
+    gemini.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if failures:
+            print("\nRegressions against", args.baseline)
+            for failure in failures:
+                print(f"  ✗ {failure}")
+            sys.exit(1)
+        print(f"\n✓ No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Password hashing throughput: how many logins (hash checks) per second the server can
+verify, hashing inline on request threads versus in the backend.passwords process pool,
+and how long a small unrelated task (standing in for the rest of the API) takes meanwhile.
+
+Usage (from the repo root):
+    python bench_passwords.py [--method scrypt:32768:8:1] [--logins 200] [--workers 1,2,4]
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import passwords
+
+
+def _probe(stop, samples):
+    # ~1 ms of pure-Python work, timed over and over: slows down when the GIL is contended
+    while not stop.is_set():
+        started = time.perf_counter()
+        total = 0
+        for i in range(20_000):
+            total += i
+        samples.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.005)
+
+
+def run(password_hash, logins, workers, threads):
+    """Verify `logins` passwords from `threads` request threads; workers=0 hashes inline."""
+    passwords.configure(workers=workers, max_pending=logins)
+    passwords.verify_password(password_hash, "warm up the pool")
+
+    stop, samples = threading.Event(), []
+    probe = threading.Thread(target=_probe, args=(stop, samples))
+    probe.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda _: passwords.verify_password(password_hash, "hunter22"), range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    probe.join()
+    assert all(results)
+
+    cores = workers or min(threads, os.cpu_count() or 1)
+    samples.sort()
+    return {
+        "mode": f"pool x{workers}" if workers else f"inline x{threads} threads",
+        "workers": workers,
+        "logins_per_second": round(logins / elapsed, 1),
+        "logins_per_second_per_core": round(logins / elapsed / cores, 1),
+        "probe_median_ms": round(statistics.median(samples), 3) if samples else None,
+        "probe_p95_ms": round(samples[int(len(samples) * 0.95)], 3) if samples else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password hashing throughput.")
+    parser.add_argument("--method", default=passwords.METHOD, help="werkzeug method string")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated pool sizes to try")
+    parser.add_argument("--threads", type=int, default=16, help="concurrent request threads")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    passwords.configure(method=args.method, workers=0)
+    password_hash = passwords.hash_password("hunter22")
+    print(f"{args.method}: {args.logins} logins from {args.threads} threads on {os.cpu_count()} CPUs\n")
+
+    rows = [run(password_hash, args.logins, 0, args.threads)]
+    for workers in (int(w) for w in args.workers.split(",") if w.strip()):
+        rows.append(run(password_hash, args.logins, workers, args.threads))
+    passwords.shutdown()
+
+    print(f"{'mode':<24} {'logins/s':>10} {'per core':>10} {'probe p50':>10} {'probe p95':>10}")
+    for row in rows:
+        print(f"{row['mode']:<24} {row['logins_per_second']:>10} {row['logins_per_second_per_core']:>10} "
+              f"{row['probe_median_ms']:>9}ms {row['probe_p95_ms']:>9}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"method": args.method, "logins": args.logins, "threads": args.threads,
+                       "cpus": os.cpu_count(), "results": rows}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,8 +13,32 @@ function getRandomColor() {
 }
 
 // Create a new group column from a provided title (used by modal confirm)
-// holds data URL of selected photo while modal is open
-let _selectedGroupImageData = null;
+// holds a promise for the selected photo's URL while the modal is open
+let _selectedGroupImage = null;
+
+// Backend that stores uploaded group images as resized files (see backend/images.py)
+const IMAGE_API_BASE = "http://localhost:5000";
+
+// Upload a photo and resolve to its URL; falls back to a data URL when the backend is unavailable
+function uploadGroupImage(file) {
+    const form = new FormData();
+    form.append('image', file);
+    return fetch(IMAGE_API_BASE + '/api/images', { method: 'POST', body: form })
+        .then(res => {
+            if (!res.ok) throw new Error('Upload failed: ' + res.status);
+            return res.json();
+        })
+        .then(image => image.url)
+        .catch(err => {
+            console.warn('Storing group image locally:', err);
+            return new Promise(resolve => {
+                const reader = new FileReader();
+                reader.onload = ev => resolve(ev.target.result);
+                reader.onerror = () => resolve(null);
+                reader.readAsDataURL(file);
+            });
+        });
+}
 
 // Create a new group column from a provided title (used by modal confirm)
 function createGroupFromTitle(groupTitle, imageDataUrl, saveToStorage = true, color = null, id = null, tags = '', prompt = '') {
@@ -179,7 +203,7 @@ function showCreateGroupModal() {
     const photoInput = document.getElementById('new-group-photo');
     const previewDiv = document.getElementById('new-group-preview');
 
-    _selectedGroupImageData = null;
+    _selectedGroupImage = null;
     if (photoInput) photoInput.value = '';
     if (previewDiv) { previewDiv.style.display = 'none'; previewDiv.style.backgroundImage = ''; }
 }
@@ -191,7 +215,7 @@ function hideCreateGroupModal() {
     modal.style.display = 'none';
     modal.setAttribute('aria-hidden', 'true');
     // clear any selected image when closing
-    _selectedGroupImageData = null;
+    _selectedGroupImage = null;
     const photoInput = document.getElementById('new-group-photo');
     const previewDiv = document.getElementById('new-group-preview');
     if (photoInput) photoInput.value = '';
@@ -416,9 +440,12 @@ document.addEventListener('DOMContentLoaded', function () {
             const tagsInput = document.getElementById('new-group-tags');
             const tagsValue = tagsInput ? tagsInput.value.trim() : '';
             const promptText = `Pondering inspirational talking points...`;
-            createGroupFromTitle(val, _selectedGroupImageData, true, null, null, tagsValue, promptText);
+            // wait for the upload (if any) so the group stores a URL
+            Promise.resolve(_selectedGroupImage).then(function (imageUrl) {
+                createGroupFromTitle(val, imageUrl, true, null, null, tagsValue, promptText);
+            });
             // clear selected image after creation
-            _selectedGroupImageData = null;
+            _selectedGroupImage = null;
             hideCreateGroupModal();
         });
         // allow Enter to confirm
@@ -430,17 +457,14 @@ document.addEventListener('DOMContentLoaded', function () {
     if (photoInput && previewDiv) {
         photoInput.addEventListener('change', function () {
             const f = photoInput.files && photoInput.files[0];
-            if (!f) { _selectedGroupImageData = null; previewDiv.style.display = 'none'; previewDiv.style.backgroundImage = ''; return; }
-            const reader = new FileReader();
-            reader.onload = function (ev) {
-                _selectedGroupImageData = ev.target.result;
-                previewDiv.style.backgroundImage = `url(${_selectedGroupImageData})`;
-                previewDiv.style.display = 'block';
-            };
-            reader.readAsDataURL(f);
+            if (!f) { _selectedGroupImage = null; previewDiv.style.display = 'none'; previewDiv.style.backgroundImage = ''; return; }
+            // preview straight from the file while it uploads
+            previewDiv.style.backgroundImage = `url(${URL.createObjectURL(f)})`;
+            previewDiv.style.display = 'block';
+            _selectedGroupImage = uploadGroupImage(f);
         });
     }
-    if (cancelBtn) cancelBtn.addEventListener('click', function () { _selectedGroupImageData = null; hideCreateGroupModal(); });
+    if (cancelBtn) cancelBtn.addEventListener('click', function () { _selectedGroupImage = null; hideCreateGroupModal(); });
     if (modal) {
         const overlay = modal.querySelector('.cg-modal-overlay');
         if (overlay) overlay.addEventListener('click', hideCreateGroupModal);
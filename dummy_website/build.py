@@ -0,0 +1,405 @@
+"""
+Build step for dummy_website: writes a production copy of the site to dist/.
+
+- Each run of adjacent local <link rel="stylesheet"> / <script src> tags in a page becomes
+  one bundle, so a page loads one stylesheet and one script instead of a dozen files.
+- CSS is minified and rules whose classes or ids appear in no page or script are dropped.
+  Class names that scripts assemble at runtime, and so never appear whole in the source,
+  are kept by the prefixes in SAFELIST; --keep-unused-css turns the pruning off.
+- JS is minified with rjsmin when it is installed; otherwise only whitespace is trimmed.
+- Bundles and the files their CSS references (fonts, images) get content-hashed names,
+  and the HTML is rewritten to point at them.
+- With Pillow installed, JPEG/PNG images are re-encoded (metadata stripped, at most
+  MAX_IMAGE_WIDTH wide) whenever that makes them smaller.
+- Text files get precompressed .gz (and .br, with the optional brotli package) siblings,
+  which serve.py sends to clients that accept them.
+
+Usage (from the repo root): python dummy_website/build.py [--out dummy_website/dist]
+Then: python dummy_website/serve.py --directory dummy_website/dist
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import os
+import posixpath
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip copies are always written
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it images are copied unchanged
+    Image = None
+
+try:
+    import rjsmin
+except ImportError:  # rjsmin is optional; without it JS is only whitespace-trimmed
+    rjsmin = None
+
+SOURCE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(SOURCE, "dist")
+
+# Not part of the site
+SKIP = {"build.py", "serve.py", "dist", "__pycache__"}
+
+# Stock photos are never shown wider than this
+MAX_IMAGE_WIDTH = 1920
+IMAGE_TYPES = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG"}
+
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".map", ".svg", ".txt", ".ttf", ".eot"}
+MIN_COMPRESS_SIZE = 1024
+
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_STYLESHEET = re.compile(r"<link\b[^>]*\brel=[\"']?stylesheet[^>]*>", re.I)
+_SCRIPT = re.compile(r"<script\b[^>]*\bsrc=[\"']([^\"']+)[\"'][^>]*>\s*</script>", re.I)
+_HREF = re.compile(r"\bhref=[\"']([^\"']+)[\"']", re.I)
+_CSS_STRING = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+_CSS_URL = re.compile(r"url\(\s*([\"']?)([^\"')]+)\1\s*\)")
+_WORD = re.compile(r"[A-Za-z_][\w-]*")
+
+# Prefixes of classes that scripts build from pieces, which the word scan of pages and
+# scripts can't see: Bootstrap adds `bs-${NAME}-auto` to tooltips and popovers
+SAFELIST = ("bs-tooltip-", "bs-popover-")
+
+
+def fingerprint(path, data):
+    """Insert a content hash before the extension: app.css -> app.3f2a9c1b0d.css."""
+    stem, ext = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def is_local(url):
+    return not re.match(r"^([a-z]+:|//|#)", url, re.I)
+
+
+# --- CSS ---------------------------------------------------------------------------------
+
+def _outside_strings(css, fn):
+    """Apply fn to every part of css that isn't inside a quoted string."""
+    parts = _CSS_STRING.split(css)
+    return "".join(part if i % 2 else fn(part) for i, part in enumerate(parts))
+
+
+def _strip_css_comments(css):
+    out, i = [], 0
+    while i < len(css):
+        ch = css[i]
+        if ch in "\"'":
+            end = i + 1
+            while end < len(css) and css[end] != ch:
+                end += 2 if css[end] == "\\" else 1
+            out.append(css[i:end + 1])
+            i = end + 1
+        elif css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = len(css) if end < 0 else end + 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def _parse_css(css):
+    """Split a stylesheet into (prelude, body) blocks and ("@statement;", None) entries."""
+    nodes, i, start, depth, quote = [], 0, 0, 0, None
+    prelude_end = None
+    while i < len(css):
+        ch = css[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "{":
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                nodes.append((css[start:prelude_end].strip(), css[prelude_end + 1:i]))
+                start = i + 1
+        elif ch == ";" and depth == 0:
+            nodes.append((css[start:i + 1].strip(), None))
+            start = i + 1
+        i += 1
+    return nodes
+
+
+def _collapse(text, punctuation="{};,>"):
+    # Leaves at most one space at either end, which may separate a value from a string
+    text = re.sub(r"\s+", " ", text)
+    return re.sub(r"\s*([%s])\s*" % re.escape(punctuation), r"\1", text)
+
+
+def _minify_css_text(text):
+    return _outside_strings(text, _collapse).strip()
+
+
+def _minify_declarations(body):
+    return _outside_strings(body, lambda part: _collapse(part, "{};,>:")).strip().rstrip(";")
+
+
+def _selector_used(selector, used):
+    if "\\" in selector:
+        return True  # escaped names aren't worth parsing; keep them
+    # :not(.x) and [attr=".x"] don't require .x to be present anywhere
+    selector = re.sub(r":not\([^)]*\)|\[[^\]]*\]", "", selector)
+    names = re.findall(r"[.#](-?[_A-Za-z][\w-]*)", selector)
+    return all(name in used or name.startswith(SAFELIST) for name in names)
+
+
+def _render_css(nodes, used, stats):
+    out = []
+    for prelude, body in nodes:
+        if body is None:
+            out.append(_minify_css_text(prelude))
+        elif prelude.startswith(("@media", "@supports", "@document")):
+            inner = _render_css(_parse_css(body), used, stats)
+            if inner:
+                out.append(f"{_minify_css_text(prelude)}{{{inner}}}")
+        elif prelude.startswith("@"):
+            # @font-face, @keyframes, @page...: kept whole
+            inner = "".join(
+                f"{_minify_css_text(p)}{{{_minify_declarations(b)}}}" if b is not None else _minify_css_text(p)
+                for p, b in _parse_css(body)
+            ) if "{" in body else _minify_declarations(body)
+            out.append(f"{_minify_css_text(prelude)}{{{inner}}}")
+        else:
+            selectors = [s.strip() for s in prelude.split(",") if s.strip()]
+            kept = [s for s in selectors if used is None or _selector_used(s, used)]
+            stats["selectors"] += len(selectors)
+            stats["dropped"] += len(selectors) - len(kept)
+            if kept:
+                out.append(f"{_minify_css_text(','.join(kept))}{{{_minify_declarations(body)}}}")
+    return "".join(out)
+
+
+def minify_css(css, used=None, stats=None):
+    """
+    Minify a stylesheet. With a set of used class/id names, rules whose selectors all
+    mention an unused class or id are dropped.
+    """
+    stats = stats if stats is not None else {"selectors": 0, "dropped": 0}
+    nodes = _parse_css(_strip_css_comments(css))
+    # @import and @charset are only valid at the top of a stylesheet, so hoist them
+    head = [node for node in nodes if node[1] is None]
+    charset = [node for node in head if node[0].lower().startswith("@charset")]
+    head = charset[:1] + [node for node in head if node not in charset]
+    rest = [node for node in nodes if node[1] is not None]
+    return _render_css(head, used, stats) + _render_css(rest, used, stats)
+
+
+# --- JS ----------------------------------------------------------------------------------
+
+def minify_js(js, name=""):
+    js = re.sub(r"^\s*//[#@] sourceMappingURL=.*$", "", js, flags=re.M)
+    if name.endswith(".min.js"):
+        return js.strip()
+    if rjsmin is not None:
+        return rjsmin.jsmin(js)
+    if "`" in js:
+        # Template literals can span lines; leave their whitespace alone
+        return js.strip()
+    return "\n".join(line.strip() for line in js.splitlines() if line.strip())
+
+
+# --- Images ------------------------------------------------------------------------------
+
+def optimize_image(data, ext):
+    """Re-encode a JPEG/PNG smaller if possible; returns the original bytes otherwise."""
+    fmt = IMAGE_TYPES.get(ext.lower())
+    if Image is None or fmt is None:
+        return data
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except OSError:
+        return data
+    if image.width > MAX_IMAGE_WIDTH:
+        image = image.resize((MAX_IMAGE_WIDTH, round(image.height * MAX_IMAGE_WIDTH / image.width)), Image.LANCZOS)
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        image.convert("RGB").save(out, fmt, quality=82, optimize=True, progressive=True)
+    else:
+        image.save(out, fmt, optimize=True)
+    return out.getvalue() if out.tell() < len(data) else data
+
+
+# --- Build -------------------------------------------------------------------------------
+
+class Builder:
+    def __init__(self, source=SOURCE, out=DEFAULT_OUT, keep_unused_css=False):
+        self.source = source
+        self.out = out
+        self.assets = {}  # site path -> fingerprinted site path
+        self.css_stats = {"selectors": 0, "dropped": 0}
+        self.used = None if keep_unused_css else self._used_names()
+
+    def _site_files(self):
+        for root, dirs, files in os.walk(self.source):
+            rel_root = os.path.relpath(root, self.source)
+            dirs[:] = [d for d in dirs if d not in SKIP]
+            for name in files:
+                if name in SKIP or name.endswith((".gz", ".br")):
+                    continue
+                yield posixpath.normpath(posixpath.join(rel_root.replace(os.sep, "/"), name))
+
+    def _read(self, site_path, mode="r"):
+        kwargs = {"encoding": "utf-8"} if mode == "r" else {}
+        with open(os.path.join(self.source, site_path), mode, **kwargs) as f:
+            return f.read()
+
+    def _write(self, site_path, data):
+        path = os.path.join(self.out, site_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data if isinstance(data, bytes) else data.encode("utf-8"))
+
+    def _used_names(self):
+        # Any word in a page or script may be a class or id (scripts add classes at runtime),
+        # so this errs on the side of keeping rules
+        used = set()
+        for site_path in self._site_files():
+            if site_path.endswith((".html", ".js")):
+                used.update(_WORD.findall(self._read(site_path)))
+        return used
+
+    def _asset(self, site_path):
+        """Copy a referenced file under a fingerprinted name; returns its new site path."""
+        if site_path not in self.assets:
+            data = optimize_image(self._read(site_path, "rb"), posixpath.splitext(site_path)[1])
+            self.assets[site_path] = fingerprint(site_path, data)
+            self._write(self.assets[site_path], data)
+        return self.assets[site_path]
+
+    def _rebase_urls(self, css, css_path, bundle_dir):
+        def rewrite(match):
+            url = match.group(2).strip()
+            if not is_local(url) or url.startswith("data:"):
+                return match.group(0)
+            path, suffix = re.match(r"([^?#]*)(.*)", url).groups()
+            site_path = posixpath.normpath(posixpath.join(posixpath.dirname(css_path), path))
+            if os.path.isfile(os.path.join(self.source, site_path)):
+                site_path = self._asset(site_path)
+            return f'url("{posixpath.relpath(site_path, bundle_dir)}{suffix}")'
+        return _CSS_URL.sub(rewrite, css)
+
+    def _bundle(self, kind, paths):
+        if kind == "css":
+            bundle_dir = "assets/css"
+            source = "\n".join(self._rebase_urls(self._read(p), p, bundle_dir) for p in paths)
+            data = minify_css(source, self.used, self.css_stats)
+        else:
+            bundle_dir = "assets/js"
+            # Guard against files that end without a semicolon
+            data = ";\n".join(minify_js(self._read(p), p) for p in paths)
+        data = data.encode("utf-8")
+        site_path = fingerprint(f"{bundle_dir}/bundle.{kind}", data)
+        self._write(site_path, data)
+        return site_path
+
+    def _tags(self, html):
+        """Local stylesheet and script tags outside comments, as (start, end, kind, path)."""
+        comments = [m.span() for m in _COMMENT.finditer(html)]
+
+        def in_comment(pos):
+            return any(start <= pos < end for start, end in comments)
+
+        tags = []
+        for match in _STYLESHEET.finditer(html):
+            href = _HREF.search(match.group(0))
+            if href and is_local(href.group(1)) and not in_comment(match.start()):
+                tags.append((match.start(), match.end(), "css", href.group(1)))
+        for match in _SCRIPT.finditer(html):
+            if is_local(match.group(1)) and not in_comment(match.start()):
+                tags.append((match.start(), match.end(), "js", match.group(1)))
+        return sorted(tags)
+
+    def _runs(self, html, tags):
+        # Tags of the same kind separated only by whitespace/comments load in sequence
+        # anyway, so they can share a bundle without changing execution order
+        runs = []
+        for tag in tags:
+            if runs:
+                last = runs[-1][-1]
+                between = _COMMENT.sub("", html[last[1]:tag[0]]).strip()
+                if last[2] == tag[2] and not between:
+                    runs[-1].append(tag)
+                    continue
+            runs.append([tag])
+        return runs
+
+    def build_page(self, site_path):
+        html = self._read(site_path)
+        tags = self._tags(html)
+        page_dir = posixpath.dirname(site_path)
+        for run in reversed(self._runs(html, tags)):
+            kind = run[0][2]
+            paths = [posixpath.normpath(posixpath.join(page_dir, tag[3].split("?")[0])) for tag in run]
+            url = posixpath.relpath(self._bundle(kind, paths), page_dir or ".")
+            if kind == "css":
+                replacement = f'<link rel="stylesheet" href="{url}">'
+            else:
+                replacement = f'<script src="{url}"></script>'
+            html = html[:run[0][0]] + replacement + html[run[-1][1]:]
+        self._write(site_path, html)
+        return len(tags), len(self._tags(html))
+
+    def build(self):
+        if os.path.isdir(self.out):
+            shutil.rmtree(self.out)
+        report = {}
+        for site_path in self._site_files():
+            if site_path.endswith(".html"):
+                report[site_path] = self.build_page(site_path)
+            else:
+                # Copied as-is too, for anything that loads files by their original names
+                data = self._read(site_path, "rb")
+                self._write(site_path, optimize_image(data, posixpath.splitext(site_path)[1]))
+        written = self.precompress()
+        return report, written
+
+    def precompress(self):
+        written = 0
+        for root, _, files in os.walk(self.out):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.splitext(name)[1] not in COMPRESSIBLE or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                with open(path + ".gz", "wb") as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                written += 1
+                if brotli is not None:
+                    with open(path + ".br", "wb") as f:
+                        f.write(brotli.compress(data, quality=11))
+                    written += 1
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bundle, minify and fingerprint dummy_website into a dist folder.")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--keep-unused-css", action="store_true", help="minify CSS without dropping any rules")
+    args = parser.parse_args()
+
+    builder = Builder(out=args.out, keep_unused_css=args.keep_unused_css)
+    report, written = builder.build()
+    for page, (before, after) in sorted(report.items()):
+        print(f"{page}: {before} local CSS/JS requests -> {after}")
+    stats = builder.css_stats
+    print(f"Dropped {stats['dropped']} of {stats['selectors']} CSS selectors as unused")
+    print(f"Wrote {len(builder.assets)} fingerprinted assets and {written} precompressed files to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
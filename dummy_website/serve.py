@@ -1,14 +1,204 @@
+"""
+Static file server for dummy_website.
+
+Each request is handled on its own thread. Small files are kept in memory and
+revalidated against their mtime; larger files are streamed with sendfile. Precompressed
+.br/.gz siblings (e.g. from a build step) are served when the client accepts them, every
+response carries an ETag, and fingerprinted files (name.<hash>.ext) are cached for a year.
+
+Usage: python dummy_website/serve.py [--port 8000] [--directory DIR]
+"""
+import argparse
+import email.utils
 import http.server
 import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
 
 PORT = 8000
 DIRECTORY = os.path.join(os.path.dirname(__file__))
 
+# Files up to this size are kept in memory; larger ones are sent straight from disk
+MAX_CACHED_FILE = 256 * 1024
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# Precompressed siblings, in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# Fingerprinted assets (ex: app.3f2a9c1b.js) never change under the same name, so clients may keep them
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class FileCache:
+    """Bounded LRU of small file bodies, keyed by path and dropped when the file's mtime or size changes."""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> (mtime_ns, size, body)
+
+    def get(self, path, stat):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            if entry[:2] != (stat.st_mtime_ns, stat.st_size):
+                self._drop(path)
+                return None
+            self._entries.move_to_end(path)
+            return entry[2]
+
+    def put(self, path, stat, body):
+        with self._lock:
+            self._drop(path)
+            self._entries[path] = (stat.st_mtime_ns, stat.st_size, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.size -= len(entry[2])
+
+
+file_cache = FileCache()
+
+
+def _etag(stat, encoding=None):
+    tag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
 class Handler(http.server.SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=DIRECTORY, **kwargs)
+    protocol_version = "HTTP/1.1"  # keep-alive, so a page's assets reuse one connection
 
-if __name__ == "__main__":
-    with http.server.HTTPServer(("", PORT), Handler) as httpd:
-        print(f"Serving dummy_website at http://localhost:{PORT}")
+    def __init__(self, *args, directory=None, **kwargs):
+        super().__init__(*args, directory=directory or DIRECTORY, **kwargs)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not self.path.split("?", 1)[0].endswith("/"):
+                # Let SimpleHTTPRequestHandler issue the trailing-slash redirect
+                return self._fallback(send_body)
+            path = os.path.join(path, "index.html")
+        if not os.path.isfile(path):
+            return self._fallback(send_body)
+
+        stat = os.stat(path)
+        served_path, served_stat, encoding = self._pick_variant(path, stat)
+        etag = _etag(served_stat, encoding)
+
+        if etag in self._if_none_match():
+            self.send_response(304)
+            self._send_cache_headers(path, etag, stat, encoding is not None or self._has_variants(path))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(served_stat.st_size))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self._send_cache_headers(path, etag, stat, encoding is not None or self._has_variants(path))
+        self.end_headers()
+        if send_body:
+            self._send_file(served_path, served_stat)
+
+    def _fallback(self, send_body):
+        # Directory listings, redirects and 404s keep the stock behaviour
+        if send_body:
+            super().do_GET()
+        else:
+            super().do_HEAD()
+
+    def _pick_variant(self, path, stat):
+        accepted = self._accepted_encodings()
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            # A stale variant (older than its source) would serve old content
+            if variant_stat.st_mtime_ns >= stat.st_mtime_ns:
+                return path + suffix, variant_stat, encoding
+        return path, stat, None
+
+    def _has_variants(self, path):
+        return any(os.path.exists(path + suffix) for _, suffix in ENCODINGS)
+
+    def _accepted_encodings(self):
+        accepted = set()
+        for part in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = part.strip().partition(";")
+            if name and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                accepted.add(name.lower())
+        return accepted
+
+    def _if_none_match(self):
+        header = self.headers.get("If-None-Match", "")
+        return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+    def _send_cache_headers(self, path, etag, stat, varies):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.send_header("Cache-Control", IMMUTABLE if FINGERPRINTED.search(path) else REVALIDATE)
+        if varies:
+            self.send_header("Vary", "Accept-Encoding")
+
+    def _send_file(self, path, stat):
+        if stat.st_size <= MAX_CACHED_FILE:
+            body = file_cache.get(path, stat)
+            if body is None:
+                with open(path, "rb") as f:
+                    body = f.read()
+                file_cache.put(path, stat, body)
+            self.wfile.write(body)
+            return
+
+        with open(path, "rb") as f:
+            self.wfile.flush()
+            offset = 0
+            try:
+                while offset < stat.st_size:
+                    sent = os.sendfile(self.connection.fileno(), f.fileno(), offset, stat.st_size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            except (AttributeError, OSError):
+                # No sendfile on this platform (or socket type): copy through userspace instead
+                f.seek(offset)
+                shutil.copyfileobj(f, self.wfile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve dummy_website over HTTP.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--directory", default=DIRECTORY, help="directory to serve")
+    args = parser.parse_args()
+
+    def handler(*handler_args, **handler_kwargs):
+        return Handler(*handler_args, directory=args.directory, **handler_kwargs)
+
+    with http.server.ThreadingHTTPServer(("", args.port), handler) as httpd:
+        print(f"Serving {os.path.abspath(args.directory)} at http://localhost:{args.port}")
         httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
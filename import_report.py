@@ -0,0 +1,81 @@
+"""
+Import-time report for the API's cold start.
+
+Runs a snippet (by default: build the app against an in-memory database) in a fresh
+interpreter with `python -X importtime`, then lists the slowest imports and the total.
+test_models.py uses import_times() to check that heavy, rarely needed packages such as the
+Gemini SDK stay out of startup.
+
+Usage (from the repo root):
+    python import_report.py
+    python import_report.py --top 30 --budget-ms 400
+    python import_report.py --code "import module"
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CODE = "from backend.app import create_app; create_app('sqlite://')"
+
+# Packages only needed for generating prompts or handling uploads; startup must not load them
+DEFERRED_MODULES = ("google.genai", "PIL")
+
+
+def import_times(code=DEFAULT_CODE, python=sys.executable):
+    """
+    Run code in a new interpreter with -X importtime. Returns a list of
+    (module, self_us, cumulative_us, depth) in import order; depth 0 is a top-level import.
+    """
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"snippet failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # one leading space, then two per level
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def total_ms(rows):
+    """Wall time spent importing, in milliseconds (the top-level imports' cumulative times)."""
+    return sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+
+
+def loaded(rows, package):
+    """True if package, or any module inside it, was imported."""
+    return any(name == package or name.startswith(package + ".") for name, _, _, _ in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import times for the API's cold start.")
+    parser.add_argument("--code", default=DEFAULT_CODE, help="Python snippet to time (default: create the app)")
+    parser.add_argument("--top", type=int, default=20, help="slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, help="exit non-zero if importing takes longer than this")
+    args = parser.parse_args()
+
+    rows = import_times(args.code)
+    print(f"{'self ms':>9} {'cumul. ms':>10}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:10.1f}  {name}")
+    print(f"\n{len(rows)} modules imported in {total_ms(rows):.1f} ms")
+
+    failures = [f"{package} was imported at startup" for package in DEFERRED_MODULES if loaded(rows, package)]
+    if args.budget_ms is not None and total_ms(rows) > args.budget_ms:
+        failures.append(f"imports took {total_ms(rows):.1f} ms (budget {args.budget_ms} ms)")
+    for failure in failures:
+        print(f"  ✗ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,52 @@
 # Object
 
+import click
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload
+
+from backend.database import RoutingSession
+from backend.home_cache import home_feed_cache
+from backend.live_updates import live_updates
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-import google.genai as genai
+import base64
+from backend.passwords import hash_password, verify_and_update
 
 # initialize
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Posts per page of a group feed
+FEED_PAGE_SIZE = 20
+
+
+# Feed cursors: opaque strings holding the (timestamp, id) of the last post on a page
+def encode_cursor(post):
+    raw = f"{post.timestamp.isoformat()}|{post.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Returns (timestamp, post_id); raises ValueError for a malformed cursor."""
+    try:
+        timestamp, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(post_id)
+    except (UnicodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+# Ids per IN (...) list, to stay under the database's bound-parameter limit
+CHUNK_SIZE = 500
+
+def chunked(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 user_group_association = db.Table('user_group_association',
-    db.Column('user_id', db.Integer, db.ForeignKey('user.id')),
-    db.Column('group_id', db.Integer, db.ForeignKey('news_group.id'))
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.Column('group_id', db.Integer, db.ForeignKey('news_group.id'), nullable=False),
+    # One row per membership; the unique index also makes "is member" a single index lookup
+    db.UniqueConstraint('user_id', 'group_id', name='uq_user_group'),
+    db.Index('ix_user_group_group_id', 'group_id'),
 )
 
 # User
@@ -18,7 +54,7 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128)) 
+    password_hash = db.Column(db.String(256))  # scrypt hashes are ~160 characters
     pfp = db.Column(db.String(255), default='default.jpg') 
     
     # Relationships
@@ -29,16 +65,28 @@ class User(db.Model):
     def set_password(self, raw_password):
         if not raw_password:
             raise ValueError("password required")
-        self.password_hash = generate_password_hash(raw_password)
+        self.password_hash = hash_password(raw_password)
 
     def check_password(self, raw_password):
-        return check_password_hash(self.password_hash, raw_password)
+        matches, new_hash = verify_and_update(self.password_hash, raw_password)
+        if new_hash:
+            # Hashed with older settings: upgrade it now that we know the password
+            self.password_hash = new_hash
+            db.session.commit()
+        return matches
 
     # Alternative for get_all_groups() that returns a list of dictionaries instead of objects
     def get_joined_groups_data(self):
         """Returns a list of dictionaries for all groups this user has joined."""
-        # 'self.groups' works because of the relationship defined in module.py
-        return [group.to_dict() for group in self.groups.all()] #
+        # Cached per user; membership changes, group edits and new posts invalidate it
+        generation = home_feed_cache.generation()
+        groups = home_feed_cache.get(self.id)
+        if groups is None:
+            # 'self.groups' works because of the relationship defined in module.py
+            groups = NewsGroup.to_dicts(self.groups.all())
+            # Not cached if a change landed while we queried; the next request will retry
+            home_feed_cache.put(self.id, groups, generation)
+        return groups
 
     def to_dict(self):
         return {
@@ -50,9 +98,14 @@ class User(db.Model):
 # Groups
 class NewsGroup(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)  # groups are looked up by name
     category = db.Column(db.String(50)) # interests/tags
     prompt_of_the_week = db.Column(db.Text) # Prompt
+
+    # Denormalized counters, kept in step by add_member/remove_member/Post.create/Post.delete_all_in_group.
+    # Run `reconcile-counts` if rows were changed some other way.
+    member_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationship with posts
     posts = db.relationship('Post', backref='group', lazy=True)
@@ -68,39 +121,144 @@ class NewsGroup(db.Model):
         db.session.commit()
         return group
 
+    def update_group_info(self, new_name=None, new_category=None):
+        """Update group name or category (cached home lists showing it are dropped on commit)."""
+        if new_name:
+            self.name = new_name
+        if new_category:
+            self.category = new_category
+        db.session.commit()
+
     # Member management methods (Not implemented yet...)
+    def is_member(self, user):
+        """Check membership with one indexed lookup instead of loading every member."""
+        user_id = user if isinstance(user, int) else user.id
+        return db.session.query(db.exists().where(db.and_(
+            user_group_association.c.user_id == user_id,
+            user_group_association.c.group_id == self.id,
+        ))).scalar()
+
     def add_member(self, user):
         """Add a user to a group."""
-        if user in self.members:
-            return False  # User already in group
-        self.members.append(user)
-        db.session.commit()
-        return True
+        return self.add_members([user.id]) == 1
 
 
     def remove_member(self, user):
         """Remove a user from a group."""
-        if user not in self.members:
-            return False  # User not in group
-        self.members.remove(user)
+        return self.remove_members([user.id]) == 1
+
+    def add_members(self, user_ids):
+        """
+        Add many users to the group in one transaction, using INSERT ... SELECT per chunk of ids.
+        Unknown ids and existing members are skipped. Returns the number of members added.
+        """
+        user_ids = set(user_ids)
+        added = 0
+        for chunk in chunked(user_ids):
+            already_member = db.exists().where(db.and_(
+                user_group_association.c.user_id == User.id,
+                user_group_association.c.group_id == self.id,
+            ))
+            new_members = db.select(User.id, db.literal(self.id)).where(User.id.in_(chunk), ~already_member)
+            result = db.session.execute(
+                user_group_association.insert().from_select(['user_id', 'group_id'], new_members)
+            )
+            added += result.rowcount
+        if added:
+            # SQL-side increment so concurrent joins can't lose an update
+            self.member_count = NewsGroup.member_count + added
         db.session.commit()
-        return True
+        if added:
+            home_feed_cache.invalidate_group(self.id)
+            home_feed_cache.invalidate_users(user_ids)
+        return added
+
+    def remove_members(self, user_ids):
+        """Remove many users from the group in one transaction. Returns the number of members removed."""
+        user_ids = set(user_ids)
+        removed = 0
+        for chunk in chunked(user_ids):
+            result = db.session.execute(user_group_association.delete().where(
+                user_group_association.c.group_id == self.id,
+                user_group_association.c.user_id.in_(chunk),
+            ))
+            removed += result.rowcount
+        if removed:
+            self.member_count = NewsGroup.member_count - removed
+        db.session.commit()
+        if removed:
+            home_feed_cache.invalidate_group(self.id)
+            home_feed_cache.invalidate_users(user_ids)
+        return removed
 
     # Analytics methods
     def get_member_count(self):
         """Get the number of members in the group."""
-        return len(self.members)
+        return self.member_count
 
-    # Not imiplemented yet...
     def get_post_count(self):
         """Get the number of posts in the group."""
-        return len(self.posts)
+        return self.post_count
+
+    @classmethod
+    def get_counts(cls, group_ids):
+        """Recounts {group_id: (member_count, post_count)} for many groups from the source tables using GROUP BY queries."""
+        group_ids = list(group_ids)
+        counts = {group_id: [0, 0] for group_id in group_ids}
+        for chunk in chunked(group_ids):
+            members = db.session.query(
+                user_group_association.c.group_id, db.func.count()
+            ).filter(user_group_association.c.group_id.in_(chunk)).group_by(user_group_association.c.group_id)
+            posts = db.session.query(
+                Post.group_id, db.func.count(Post.id)
+            ).filter(Post.group_id.in_(chunk)).group_by(Post.group_id)
+            for group_id, count in members:
+                counts[group_id][0] = count
+            for group_id, count in posts:
+                counts[group_id][1] = count
+        return {group_id: tuple(pair) for group_id, pair in counts.items()}
+
+    @classmethod
+    def reconcile_counts(cls):
+        """Recompute member_count and post_count for every group in one UPDATE. Returns how many groups were off."""
+        members = db.select(db.func.count()).select_from(user_group_association).where(
+            user_group_association.c.group_id == cls.id
+        ).scalar_subquery()
+        posts = db.select(db.func.count(Post.id)).where(Post.group_id == cls.id).scalar_subquery()
+        result = db.session.execute(
+            db.update(cls)
+            .where(db.or_(cls.member_count != members, cls.post_count != posts))
+            .values(member_count=members, post_count=posts)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount:
+            home_feed_cache.clear()
+        return result.rowcount
 
     # Get all posts in the group, ordered by most recent        
     def get_all_posts(self):
         """Get all posts in the group, ordered by most recent."""
-        from module import Post
-        return Post.query.filter_by(group_id=self.id).order_by(Post.timestamp.desc()).all()
+        # Authors are joined in so Post.to_dict doesn't issue a query per post
+        return Post.query.options(joinedload(Post.author)).filter_by(group_id=self.id).order_by(Post.timestamp.desc()).all()
+
+    def get_feed(self, limit=FEED_PAGE_SIZE, cursor=None):
+        """
+        Get one page of posts, most recent first, starting after `cursor`.
+        Returns (posts, next_cursor); next_cursor is None on the last page.
+        Seeks on the (group_id, timestamp, id) index, so every page costs the same no matter how deep.
+        """
+        query = Post.query.options(joinedload(Post.author)).filter(Post.group_id == self.id)
+        if cursor:
+            timestamp, post_id = decode_cursor(cursor)
+            query = query.filter(db.or_(
+                Post.timestamp < timestamp,
+                db.and_(Post.timestamp == timestamp, Post.id < post_id),
+            ))
+        posts = query.order_by(Post.timestamp.desc(), Post.id.desc()).limit(limit + 1).all()
+        if len(posts) > limit:
+            return posts[:limit], encode_cursor(posts[limit - 1])
+        return posts, None
 
     def to_dict(self, include_members=False, include_posts=False):
         result = {
@@ -114,26 +272,60 @@ class NewsGroup(db.Model):
         if include_members:
             result['members'] = [member.to_dict() for member in self.members]
         if include_posts:
-            result['posts'] = [post.to_dict() for post in self.get_all_posts()]
+            # First page only; clients fetch the rest with next_cursor
+            posts, result['next_cursor'] = self.get_feed()
+            result['posts'] = [post.to_dict() for post in posts]
         return result
     
+    @classmethod
+    def to_dicts(cls, groups, include_members=False):
+        """Serialize many groups; counts come from the denormalized columns, so no extra queries."""
+        if include_members and groups:
+            # One SELECT ... IN for every group's members instead of one per group
+            cls.query.options(selectinload(cls.members)).filter(cls.id.in_([group.id for group in groups])).all()
+        return [group.to_dict(include_members=include_members) for group in groups]
+
     # Consider removing this
     def to_summary(self):
         """Return a summary string representation of the group."""
-        return f"{self.name} ({self.category}) - {len(self.members)} members, {len(self.posts)} posts"
+        return f"{self.name} ({self.category}) - {self.get_member_count()} members, {self.get_post_count()} posts"
     
     def set_prompt(self):
-        """Generate and set a weekly prompt for the group using Gemini AI."""
-        from backend.weekly_prompt import generate_weekly_prompt
-        new_prompt = generate_weekly_prompt(self.category, self.name)
+        """Set this week's prompt for the group, generating it with Gemini AI only if it isn't cached yet."""
+        from backend.weekly_prompt import get_weekly_prompt
+        new_prompt = get_weekly_prompt(self.category or "General", self.name)
         
         # Only update if we actually got a valid response back
         if new_prompt:
             self.prompt_of_the_week = new_prompt
             db.session.commit()
+            home_feed_cache.invalidate_group(self.id)
             
         return self.prompt_of_the_week
 
+# Groups edited through the ORM (renamed, new prompt, deleted...) drop the cached home lists that
+# show them once the change commits. Bulk UPDATEs bypass this and invalidate explicitly.
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_changed_groups(session, flush_context):
+    changed = session.info.setdefault("changed_groups", set())
+    for obj in session.deleted:
+        if isinstance(obj, NewsGroup):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, NewsGroup) and session.is_modified(obj, include_collections=False):
+            changed.add(obj.id)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_changed_groups(session):
+    for group_id in session.info.pop("changed_groups", ()):
+        home_feed_cache.invalidate_group(group_id)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_changed_groups(session):
+    session.info.pop("changed_groups", None)
+
 # Post
 class Post(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -144,6 +336,13 @@ class Post(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) # Author
     group_id = db.Column(db.Integer, db.ForeignKey('news_group.id'), nullable=False)
 
+    # Backs NewsGroup.get_feed's keyset pagination (and any lookup by group_id)
+    __table_args__ = (
+        db.Index('ix_post_group_timestamp_id', 'group_id', 'timestamp', 'id'),
+        # Posts by author (User.posts); group_id lookups use the index above
+        db.Index('ix_post_user_id', 'user_id'),
+    )
+
     
     @classmethod
     def create(cls, title, content, user_id, group_id):
@@ -155,7 +354,12 @@ class Post(db.Model):
             group_id=group_id
         )
         db.session.add(post)
+        NewsGroup.query.filter_by(id=group_id).update(
+            {NewsGroup.post_count: NewsGroup.post_count + 1}, synchronize_session=False
+        )
         db.session.commit()
+        home_feed_cache.invalidate_group(group_id)
+        live_updates.publish(group_id, "post", post.to_dict)
         return post
     
     # Not implemented yet...
@@ -167,6 +371,7 @@ class Post(db.Model):
             self.title = new_title
         self.timestamp = datetime.utcnow()
         db.session.commit()
+        live_updates.publish(self.group_id, "edit", self.to_dict)
     
     # Confirm with team if this is the functionality of Clear button
     @classmethod
@@ -175,7 +380,10 @@ class Post(db.Model):
         try:
             # Efficiently delete all matching rows in one query
             cls.query.filter_by(group_id=group_id).delete()
+            NewsGroup.query.filter_by(id=group_id).update({NewsGroup.post_count: 0}, synchronize_session=False)
             db.session.commit()
+            home_feed_cache.invalidate_group(group_id)
+            live_updates.publish(group_id, "clear", {})
             return True
         except Exception as e:
             db.session.rollback()
@@ -189,4 +397,12 @@ class Post(db.Model):
             'content': self.content,
             'author': self.author.username,
             'timestamp': self.timestamp.isoformat(),
-        }
\ No newline at end of file
+        }
+
+
+@click.command('reconcile-counts')
+@with_appcontext
+def reconcile_counts_command():
+    """Recompute every group's member and post counters."""
+    repaired = NewsGroup.reconcile_counts()
+    click.echo(f"Repaired counters on {repaired} group(s).")
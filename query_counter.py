@@ -0,0 +1,48 @@
+"""
+Helpers for counting the SQL statements an operation issues, used by test_models.py
+to catch N+1 regressions in the serialization paths.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+def _engines(engine):
+    # One engine, or several (ex: db.engines.values() when reads go to a separate bind)
+    return [engine] if hasattr(engine, "dialect") else list(engine)
+
+
+@contextmanager
+def count_queries(engine):
+    """Record every statement executed on engine (or engines) inside the with-block."""
+    counter = QueryCounter()
+    engines = _engines(engine)
+    for each in engines:
+        event.listen(each, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for each in engines:
+            event.remove(each, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(engine, limit):
+    """Fail if the with-block runs more than `limit` statements, listing what it ran."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        executed = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(counter.statements))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{executed}")
@@ -2,17 +2,34 @@
 Test driver for User, Post, and NewsGroup models.
 Run this file to test all methods in your models.
 """
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
 from flask import Flask
-from module import db, User, NewsGroup, Post
-from datetime import datetime
+from backend import gemini_client, passwords, weekly_prompt
+from backend.database import init_database
+from backend.home_cache import home_feed_cache
+from backend.live_updates import live_updates
+from backend.prompt_cache import PromptCache, iso_week, prompt_key
+from backend.single_flight import AsyncSingleFlight, SingleFlight
+from module import db, user_group_association, User, NewsGroup, Post
+from import_report import DEFERRED_MODULES, import_times, loaded, total_ms
+from query_counter import assert_max_queries
+from datetime import datetime, timedelta, timezone
 
 # Create Flask app for testing
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Initialize database
-db.init_app(app)
+# Initialize database (tuned SQLite profile)
+init_database(app, db, 'sqlite:///test.db')
+
+# Fixtures created by the tests, removed again by cleanup_test_data
+TEST_USERNAMES = ['testuser', 'anotheruser']
+TEST_GROUP_NAMES = ['Daily Journal', 'Evening Journal', 'Evening Journal Weekly', 'Tech Thoughts', 'Fitness Goals']
 
 def print_section(title):
     """Helper function to print section headers."""
@@ -21,34 +38,35 @@ def print_section(title):
     print(f"{'='*60}\n")
 
 def cleanup_test_data():
-    """Delete all test data if it exists."""
+    """Delete all test data if it exists, including memberships and posts in test groups."""
     print_section("CLEANING UP EXISTING TEST DATA")
     
-    # Delete test posts
-    test_posts = Post.query.join(User).filter(
-        User.username.in_(['testuser', 'anotheruser'])
-    ).all()
-    for post in test_posts:
-        db.session.delete(post)
-    print(f"   ✓ Deleted {len(test_posts)} test posts")
+    user_ids = [u.id for u in User.query.filter(User.username.in_(TEST_USERNAMES))]
+    group_ids = [g.id for g in NewsGroup.query.filter(NewsGroup.name.in_(TEST_GROUP_NAMES))]
+    
+    # Delete test posts (by test users, or in test groups)
+    deleted = Post.query.filter(db.or_(Post.user_id.in_(user_ids), Post.group_id.in_(group_ids))).delete(
+        synchronize_session=False
+    )
+    print(f"   ✓ Deleted {deleted} test posts")
+    
+    # Delete memberships of test users and in test groups
+    db.session.execute(user_group_association.delete().where(db.or_(
+        user_group_association.c.user_id.in_(user_ids), user_group_association.c.group_id.in_(group_ids)
+    )))
     
     # Delete test groups
-    test_groups = NewsGroup.query.filter(
-        NewsGroup.name.in_(['Daily Journal', 'Tech Thoughts', 'Fitness Goals'])
-    ).all()
-    for group in test_groups:
-        db.session.delete(group)
-    print(f"   ✓ Deleted {len(test_groups)} test groups")
+    deleted = NewsGroup.query.filter(NewsGroup.id.in_(group_ids)).delete(synchronize_session=False)
+    print(f"   ✓ Deleted {deleted} test groups")
     
     # Delete test users
-    test_users = User.query.filter(
-        User.username.in_(['testuser', 'anotheruser'])
-    ).all()
-    for user in test_users:
-        db.session.delete(user)
-    print(f"   ✓ Deleted {len(test_users)} test users")
+    deleted = User.query.filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    print(f"   ✓ Deleted {deleted} test users")
     
     db.session.commit()
+    # Other groups may have lost test posts or members
+    NewsGroup.reconcile_counts()
+    home_feed_cache.clear()
     print("   ✓ Cleanup complete!")
 
 def test_user_methods():
@@ -82,6 +100,22 @@ def test_user_methods():
     db.session.add(user2)
     db.session.commit()
     print(f"   ✓ Created: {user2.username} with custom pfp: {user2.pfp}")
+    
+    # Test password hashing and rehash-on-login
+    print("\n4. Testing set_password() / check_password()...")
+    user1.set_password("correct horse")
+    db.session.commit()
+    assert user1.check_password("correct horse")
+    assert not user1.check_password("wrong horse")
+    print(f"   ✓ Hashed with {user1.password_hash.split('$', 1)[0]}")
+    original_method = passwords.METHOD
+    passwords.configure(method="pbkdf2:sha256:1000")
+    try:
+        assert user1.check_password("correct horse")
+        assert user1.password_hash.startswith("pbkdf2:sha256:1000$")
+        print("   ✓ Rehashed with the new settings on login")
+    finally:
+        passwords.configure(method=original_method)
 
 def test_newsgroup_methods():
     """Test all NewsGroup methods."""
@@ -138,22 +172,24 @@ def test_newsgroup_methods():
     user = User.query.filter_by(username="testuser").first()
     user2 = User.query.filter_by(username="anotheruser").first()
     
-    group1.members.append(user)
-    group1.members.append(user2)
-    group2.members.append(user)
-    db.session.commit()
-    print(f"   ✓ Added {len(group1.members)} members to {group1.name}")
-    print(f"   ✓ Added {len(group2.members)} member(s) to {group2.name}")
+    group1.add_member(user)
+    group1.add_member(user2)
+    group2.add_member(user)
+    print(f"   ✓ Added {group1.member_count} members to {group1.name}")
+    print(f"   ✓ Added {group2.member_count} member(s) to {group2.name}")
     
     # Test 6: Get member count
     print("\n6. Testing get_member_count()...")
-    print(f"   ✓ {group1.name} has {len(group1.members)} members")
-    print(f"   ✓ {group2.name} has {len(group2.members)} member(s)")
+    print(f"   ✓ {group1.name} has {group1.get_member_count()} members")
+    print(f"   ✓ {group2.name} has {group2.get_member_count()} member(s)")
     
     # Test 7: Get post count (will be 0 initially)
     print("\n7. Testing get_post_count()...")
-    print(f"   ✓ {group1.name} has {len(group1.posts)} posts")
-    print(f"   ✓ {group2.name} has {len(group2.posts)} posts")
+    print(f"   ✓ {group1.name} has {group1.get_post_count()} posts")
+    print(f"   ✓ {group2.name} has {group2.get_post_count()} posts")
+    counts = NewsGroup.get_counts([group1.id, group2.id])
+    assert counts[group1.id] == (group1.get_member_count(), group1.get_post_count())
+    print(f"   ✓ Bulk counts: {counts}")
     
     # Test 8: Test to_dict without options
     print("\n8. Testing to_dict() - basic...")
@@ -240,7 +276,8 @@ def test_post_methods():
     posts_before = Post.query.count()
     print(f"   Before delete: {posts_before} posts in database")
     
-    post2.delete()
+    db.session.delete(post2)
+    db.session.commit()
     posts_after = Post.query.count()
     print(f"   After delete: {posts_after} posts in database")
     print(f"   ✓ Successfully deleted post: '{post2.title}'")
@@ -267,7 +304,25 @@ def test_newsgroup_post_methods():
     
     # Test 3: Get post count (should be updated now)
     print("\n3. Testing get_post_count() after creating posts...")
-    print(f"   ✓ {group.name} now has {len(group.posts)} posts")
+    print(f"   ✓ {group.name} now has {group.get_post_count()} posts")
+    
+    # Test 4: Counters match the source tables
+    print("\n4. Testing reconcile_counts()...")
+    repaired = NewsGroup.reconcile_counts()
+    counts = NewsGroup.get_counts([group.id])
+    assert counts[group.id] == (group.member_count, group.post_count)
+    print(f"   ✓ Repaired {repaired} group(s); {group.name} counters are in sync: {counts[group.id]}")
+    
+    # Test 5: Walk the feed one post per page
+    print("\n5. Testing get_feed() pagination...")
+    seen = []
+    posts, cursor = group.get_feed(limit=1)
+    seen.extend(posts)
+    while cursor:
+        posts, cursor = group.get_feed(limit=1, cursor=cursor)
+        seen.extend(posts)
+    assert [post.id for post in seen] == [post.id for post in group.get_all_posts()]
+    print(f"   ✓ Paged through {len(seen)} posts in feed order")
 
 def test_newsgroup_member_operations():
     """Test NewsGroup member management methods."""
@@ -287,29 +342,37 @@ def test_newsgroup_member_operations():
     # Test 2: Add member
     print("\n2. Testing add member...")
     user = User.query.filter_by(username="testuser").first()
-    print(f"   Members before: {len(fitness_group.members)}")
-    fitness_group.members.append(user)
-    db.session.commit()
-    print(f"   Members after: {len(fitness_group.members)}")
+    print(f"   Members before: {fitness_group.member_count}")
+    fitness_group.add_member(user)
+    print(f"   Members after: {fitness_group.member_count}")
     print(f"   ✓ Added {user.username} to {fitness_group.name}")
     
     # Test 3: Check if user is member
     print("\n3. Testing membership check...")
-    is_member = user in fitness_group.members
+    is_member = fitness_group.is_member(user)
     print(f"   ✓ Is {user.username} a member? {is_member}")
     
     # Test 4: Remove member
     print("\n4. Testing remove member...")
-    print(f"   Members before: {len(fitness_group.members)}")
-    fitness_group.members.remove(user)
-    db.session.commit()
-    print(f"   Members after: {len(fitness_group.members)}")
+    print(f"   Members before: {fitness_group.member_count}")
+    fitness_group.remove_member(user)
+    print(f"   Members after: {fitness_group.member_count}")
     print(f"   ✓ Removed {user.username} from {fitness_group.name}")
     
     # Test 5: Verify member removed
     print("\n5. Verifying member was removed...")
-    is_member_after = user in fitness_group.members
+    is_member_after = fitness_group.is_member(user)
     print(f"   ✓ Is {user.username} still a member? {is_member_after}")
+    
+    # Test 6: Bulk add and remove
+    print("\n6. Testing add_members() / remove_members()...")
+    user_ids = [u.id for u in User.query.filter(User.username.in_(['testuser', 'anotheruser']))]
+    added = fitness_group.add_members(user_ids + [user_ids[0], -1])  # duplicate and unknown ids are skipped
+    assert added == len(user_ids) and fitness_group.member_count == len(user_ids)
+    assert fitness_group.add_members(user_ids) == 0
+    removed = fitness_group.remove_members(user_ids)
+    assert removed == len(user_ids) and fitness_group.member_count == 0
+    print(f"   ✓ Added {added} and removed {removed} members in bulk")
 
 def test_user_group_association():
     """Test user-group many-to-many relationship."""
@@ -331,6 +394,785 @@ def test_user_group_association():
         print(f"   ✓ {group.name} has {len(group.members)} member(s):")
         for member in group.members:
             print(f"      - {member.username}")
+    
+    # Cached home page list
+    print("\n3. Testing get_joined_groups_data() caching...")
+    home_feed_cache.clear()
+    first = user.get_joined_groups_data()
+    with assert_max_queries(db.engines.values(), 0):
+        second = user.get_joined_groups_data()
+    assert first == second
+    Post.create(title="Cache buster", content="New posts invalidate the home page.", user_id=user.id, group_id=group1.id)
+    refreshed = user.get_joined_groups_data()
+    assert next(g for g in refreshed if g['id'] == group1.id)['post_count'] == group1.post_count
+    print(f"   ✓ Cache stats: {home_feed_cache.stats()}")
+    
+    # Renaming a group refreshes every cached list that shows it
+    print("\n4. Testing that group edits refresh the cached home page...")
+    group1.update_group_info(new_name="Evening Journal Weekly")
+    assert next(g for g in user.get_joined_groups_data() if g['id'] == group1.id)['name'] == "Evening Journal Weekly"
+    group1.name = "Evening Journal"  # plain attribute edits are picked up on commit too
+    db.session.commit()
+    assert next(g for g in user.get_joined_groups_data() if g['id'] == group1.id)['name'] == "Evening Journal"
+    print("   ✓ Renamed group shows its new name")
+    
+    # A change that lands while the list is being queried must not leave the old list cached
+    print("\n5. Testing an invalidation during the home list query...")
+    home_feed_cache.clear()
+    interrupted = []
+    
+    def change_group_mid_query(*args):
+        if not interrupted:
+            interrupted.append(True)
+            home_feed_cache.invalidate_group(group1.id)  # as another request's new post would
+    
+    for engine in db.engines.values():
+        db.event.listen(engine, "before_cursor_execute", change_group_mid_query)
+    try:
+        user.get_joined_groups_data()
+    finally:
+        for engine in db.engines.values():
+            db.event.remove(engine, "before_cursor_execute", change_group_mid_query)
+    assert interrupted and home_feed_cache.get(user.id) is None and home_feed_cache.etag(user.id) is None
+    user.get_joined_groups_data()
+    assert home_feed_cache.get(user.id) is not None
+    print("   ✓ The list read during the change wasn't cached; the next request cached a fresh one")
+
+def test_serialization_query_counts():
+    """Check that serializing groups doesn't issue a query per post or member."""
+    print_section("TESTING SERIALIZATION QUERY COUNTS")
+    
+    group = NewsGroup.query.filter_by(name="Evening Journal").first()
+    other = User.query.filter_by(username="anotheruser").first()
+    Post.create(title="Another voice", content="A post by a second author.", user_id=other.id, group_id=group.id)
+    
+    # Test 1: group row + members + posts joined with their authors
+    print("1. Testing to_dict(include_members=True, include_posts=True)...")
+    db.session.expire_all()
+    with assert_max_queries(db.engines.values(), 3) as queries:
+        group.to_dict(include_members=True, include_posts=True)
+    print(f"   ✓ {queries.count} queries for {group.get_post_count()} posts")
+    
+    # Test 2: many groups with members
+    print("\n2. Testing NewsGroup.to_dicts(include_members=True)...")
+    db.session.expire_all()
+    groups = NewsGroup.query.all()
+    with assert_max_queries(db.engines.values(), 2) as queries:
+        NewsGroup.to_dicts(groups, include_members=True)
+    print(f"   ✓ {queries.count} queries for {len(groups)} groups")
+
+def test_live_updates():
+    """Test that post changes reach live streams and can be replayed after a reconnect."""
+    print_section("TESTING LIVE UPDATES")
+    
+    group = NewsGroup.query.filter_by(name="Fitness Goals").first()
+    user = User.query.filter_by(username="testuser").first()
+    
+    def parse(message):
+        lines = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+        return lines["id"], lines["event"], json.loads(lines["data"])
+    
+    async def run():
+        # Test 1: create, edit and clear each send one event
+        print("1. Testing events from Post.create, edit_content and delete_all_in_group...")
+        subscription = live_updates.subscribe(group.id)
+        post = Post.create(title="Leg day", content="Squats and lunges.", user_id=user.id, group_id=group.id)
+        post.edit_content(new_content="Squats, lunges and a long walk.")
+        Post.delete_all_in_group(group.id)
+        events = [parse(await subscription.get(timeout=1)) for _ in range(3)]
+        subscription.close()
+        assert [event for _, event, _ in events] == ["post", "edit", "clear"]
+        assert events[0][2]["id"] == post.id and events[1][2]["content"] == "Squats, lunges and a long walk."
+        print(f"   ✓ Received: {', '.join(event for _, event, _ in events)}")
+        
+        # Test 2: reconnecting with Last-Event-ID replays only what was missed
+        print("\n2. Testing resume with Last-Event-ID...")
+        resumed = live_updates.subscribe(group.id, last_event_id=events[0][0])
+        replayed = [parse(await resumed.get(timeout=1))[1] for _ in range(2)]
+        resumed.close()
+        assert replayed == ["edit", "clear"] and not resumed.reset
+        print(f"   ✓ Replayed: {', '.join(replayed)}")
+        
+        # Test 3: an id from another server run can't be resumed
+        print("\n3. Testing resume with an unknown id...")
+        stale = live_updates.subscribe(group.id, last_event_id="00000000-1")
+        stale.close()
+        assert stale.reset
+        print("   ✓ Client told to reload")
+        
+        # Test 4: a group nobody has watched doesn't serialize its events
+        print("\n4. Testing a group without streams...")
+        built = []
+        unwatched = max(group.id for group in NewsGroup.query.all()) + 1
+        live_updates.publish(unwatched, "post", lambda: built.append(1) or {})
+        assert not built and unwatched not in live_updates._history
+        live_updates.subscribe(unwatched).close()
+        live_updates.publish(unwatched, "post", lambda: built.append(1) or {})
+        assert built == [1] and len(live_updates._history[unwatched]) == 1
+        print("   ✓ Payload built only once the group had been subscribed to")
+    
+    asyncio.run(run())
+
+def test_cold_start_imports():
+    """Check that creating the app doesn't import the Gemini SDK or Pillow."""
+    print_section("TESTING COLD START IMPORTS")
+    
+    print("1. Timing imports for create_app() in a fresh interpreter...")
+    rows = import_times()
+    for package in DEFERRED_MODULES:
+        assert not loaded(rows, package), f"{package} was imported at startup"
+        print(f"   ✓ {package} not imported")
+    slowest = sorted(rows, key=lambda row: row[2], reverse=True)[:5]
+    print(f"   ✓ {len(rows)} modules in {total_ms(rows):.1f} ms; slowest: "
+          + ", ".join(f"{name} ({cumulative / 1000:.1f} ms)" for name, _, cumulative, _ in slowest))
+
+def test_prompt_cache():
+    """Test the weekly prompt cache: persistence, week rollover and eviction."""
+    print_section("TESTING PROMPT CACHE")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prompts.db")
+        
+        # Test 1: entries survive a restart
+        print("1. Testing that prompts persist across cache instances...")
+        key = prompt_key(" Tech Thoughts ", "Technology")
+        assert key == ("tech thoughts", "technology", iso_week())
+        entry = PromptCache(path).set(key, "What gadget changed your week?")
+        reopened = PromptCache(path)
+        assert reopened.get_entry(key) == entry and reopened.hits == 1
+        print(f"   ✓ Reloaded from disk with etag {entry.etag}")
+        
+        # Test 2: last week's prompt is expired, this week's is kept until Monday
+        print("\n2. Testing ISO week rollover...")
+        last_week = prompt_key("Tech Thoughts", "Technology", iso_week(datetime.utcnow().date() - timedelta(days=7)))
+        reopened.set(last_week, "Last week's question")
+        assert reopened.get(last_week) is None
+        assert time.time() < entry.expires_at <= time.time() + 7 * 24 * 3600
+        print("   ✓ Last week's prompt is a miss; this week's expires at the rollover")
+        
+        # Test 3: an explicit ttl expires on its own
+        print("\n3. Testing ttl expiry...")
+        short = prompt_key("Fitness Goals", "health")
+        reopened.set(short, "Fallback question", ttl=-1)
+        assert reopened.get(short) is None
+        print("   ✓ Expired fallback prompt is a miss")
+        
+        # Test 4: the table is bounded, oldest prompts go first
+        print("\n4. Testing eviction...")
+        cache = PromptCache(os.path.join(tmp, "bounded.db"), max_entries=10, memory_entries=4)
+        keys = [prompt_key(f"Group {i}", "General") for i in range(15)]
+        for i, key in enumerate(keys):
+            cache.set(key, f"Question {i}")
+        rows = cache._conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+        assert rows <= 10 and len(cache._memory) <= 4
+        assert cache.get(keys[0]) is None and cache.get(keys[-1]) == "Question 14"
+        print(f"   ✓ {rows} of 15 prompts kept, newest still cached")
+
+def test_single_flight():
+    """Test that concurrent misses for one key share a single call."""
+    print_section("TESTING SINGLE FLIGHT")
+    
+    # Test 1: threads asking for the same key wait for the leader's result
+    print("1. Testing SingleFlight.do() with 8 threads...")
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+    
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return value.upper()
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow, "prompt"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.01)
+    time.sleep(0.1)  # let the followers reach the wait
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == ["prompt"] and results == ["PROMPT"] * 8 and flight.in_flight() == 0
+    print(f"   ✓ 1 call for {len(results)} callers")
+    
+    # Test 2: errors are raised to the caller and the key can be retried
+    print("\n2. Testing error propagation...")
+    def fail():
+        raise RuntimeError("model down")
+    try:
+        flight.do("key", fail)
+        raise AssertionError("the error was swallowed")
+    except RuntimeError as e:
+        print(f"   ✓ Raised: {e}")
+    assert flight.do("key", lambda: "retried") == "retried"
+    print("   ✓ Next call runs again")
+    
+    # Test 3: asyncio callers share one task, and a caller's timeout doesn't cancel it
+    print("\n3. Testing AsyncSingleFlight.task()...")
+    async def run():
+        async_flight = AsyncSingleFlight()
+        async_calls = []
+        
+        async def generate():
+            async_calls.append(1)
+            await asyncio.sleep(0.05)
+            return "question"
+        
+        tasks = [async_flight.task("key", generate) for _ in range(5)]
+        assert all(task is tasks[0] for task in tasks)
+        try:
+            await asyncio.wait_for(asyncio.shield(tasks[0]), 0.001)
+        except asyncio.TimeoutError:
+            pass
+        assert await tasks[0] == "question" and len(async_calls) == 1
+        await asyncio.sleep(0)
+        assert async_flight.in_flight() == 0
+    asyncio.run(run())
+    print("   ✓ 5 callers shared 1 task, which outlived a caller's deadline")
+
+class FakeGemini:
+    """Stand-in for the shared Gemini client manager that answers from a list of replies."""
+    
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+    
+    def generate_content(self, contents, model=None, config=None):
+        self.calls.append("batch" if config else "single")
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return type("Response", (), {"text": reply})()
+    
+    async def generate_content_async(self, contents, model=None, config=None):
+        return self.generate_content(contents, model, config)
+
+def test_batched_prompts():
+    """Test that one Gemini call covers a batch, with per-group calls only for what it missed."""
+    print_section("TESTING BATCHED PROMPT GENERATION")
+    
+    groups = [("Tech Thoughts", "technology"), ("Fitness Goals", "health"), ("Evening Journal", "reflection")]
+    saved = gemini_client._manager
+    try:
+        # Test 1: a complete JSON answer needs no other call
+        print("1. Testing a complete batched answer...")
+        gemini_client._manager = fake = FakeGemini([json.dumps(
+            [{"id": i, "question": f"Question {i}?"} for i in range(3)]
+        )])
+        prompts = weekly_prompt.generate_weekly_prompts(groups)
+        assert fake.calls == ["batch"] and prompts[groups[2]] == "Question 2?"
+        print(f"   ✓ {len(prompts)} prompts from {len(fake.calls)} call")
+        
+        # Test 2: unanswered, blank and out-of-range items fall back to single calls
+        print("\n2. Testing a partial answer...")
+        gemini_client._manager = fake = FakeGemini([
+            json.dumps([{"id": 0, "question": "Only one?"}, {"id": 1, "question": " "}, {"id": 7, "question": "Nope"}]),
+            "Single 1?", "Single 2?",
+        ])
+        prompts = weekly_prompt.generate_weekly_prompts(groups)
+        assert fake.calls == ["batch", "single", "single"]
+        assert [prompts[group] for group in groups] == ["Only one?", "Single 1?", "Single 2?"]
+        print(f"   ✓ Calls: {', '.join(fake.calls)}")
+        
+        # Test 3: a reply that isn't JSON falls back for every group
+        print("\n3. Testing a malformed batched answer...")
+        gemini_client._manager = fake = FakeGemini(["Here are your questions!", "A?", "B?", "Still not JSON", "C?"])
+        prompts = weekly_prompt.generate_weekly_prompts(groups + groups[:1], batch_size=2)  # duplicates are dropped
+        assert fake.calls == ["batch", "single", "single", "batch", "single"]
+        assert [prompts[group] for group in groups] == ["A?", "B?", "C?"]
+        print(f"   ✓ Calls: {', '.join(fake.calls)}")
+        
+        # Test 4: an unreachable model gives the default question without further calls
+        print("\n4. Testing a failed batch call...")
+        gemini_client._manager = fake = FakeGemini([RuntimeError("model down")])
+        prompts = weekly_prompt.generate_weekly_prompts(groups)
+        assert fake.calls == ["batch"]
+        assert all(prompts[group] == weekly_prompt.default_prompt(group[0]) for group in groups)
+        print("   ✓ Default question for every group")
+    finally:
+        gemini_client._manager = saved
+
+def test_async_prompt_flight():
+    """Test that an async flight doesn't regenerate a prompt another flight just stored."""
+    print_section("TESTING ASYNC PROMPT GENERATION")
+    
+    saved = gemini_client._manager
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PromptCache(os.path.join(tmp, "prompts.db"))
+        key = prompt_key("Tech Thoughts", "technology")
+        try:
+            # Test 1: a miss generates and stores the prompt
+            print("1. Testing a miss...")
+            gemini_client._manager = fake = FakeGemini(["First question?"])
+            entry = asyncio.run(weekly_prompt._generate_and_cache_async(cache, key, "technology", "Tech Thoughts"))
+            assert entry.prompt == "First question?" and len(fake.calls) == 1
+            print(f"   ✓ Generated with etag {entry.etag}")
+            
+            # Test 2: a flight that starts after the fill reuses it, keeping the etag
+            print("\n2. Testing a flight that starts after the entry was filled...")
+            gemini_client._manager = fake = FakeGemini(["Second question?"])
+            again = asyncio.run(weekly_prompt._generate_and_cache_async(cache, key, "technology", "Tech Thoughts"))
+            assert again.etag == entry.etag and fake.calls == []
+            print("   ✓ No second Gemini call; etag unchanged")
+        finally:
+            gemini_client._manager = saved
+
+def test_posts_api():
+    """Test the post endpoints' validation and the shared guest author."""
+    print_section("TESTING POSTS API")
+    
+    from backend.app import create_app, guest_user
+    
+    # Test 1: a PATCH without fields is refused and leaves the post alone
+    print("1. Testing PATCH /api/posts/<id> without content or title...")
+    api_app = create_app("sqlite://")
+    client = api_app.test_client()
+    with api_app.app_context():
+        group = client.post("/api/groups", json={"name": "Tech Thoughts", "category": "technology"}).get_json()
+        post = client.post(f"/api/groups/{group['id']}/posts", json={"content": "Hello"}).get_json()
+        response = client.patch(f"/api/posts/{post['id']}", json={})
+        assert response.status_code == 400
+        assert db.session.get(Post, post["id"]).to_dict()["timestamp"] == post["timestamp"]
+        print(f"   ✓ {response.status_code}: {response.get_json()['error']}")
+        edited = client.patch(f"/api/posts/{post['id']}", json={"title": "Greeting"}).get_json()
+        assert edited["title"] == "Greeting" and edited["content"] == "Hello"
+        print("   ✓ A title-only edit keeps the content")
+    
+    # Test 2: losing the race to create the guest user reuses the winner's row
+    print("\n2. Testing guest_user() when another request creates it first...")
+    db.session.execute(db.delete(User).where(User.username == "guest"))
+    db.session.commit()
+    
+    def insert_elsewhere(session, flush_context, instances):
+        with db.engine.begin() as connection:
+            connection.execute(db.insert(User).values(username="guest", email="guest@notable.local", pfp="default.jpg"))
+    
+    db.event.listen(db.session, "before_flush", insert_elsewhere, once=True)
+    guest = guest_user()
+    assert User.query.filter_by(username="guest").count() == 1 and guest.username == "guest"
+    print(f"   ✓ Reused guest user {guest.id}")
+    db.session.delete(guest)
+    db.session.commit()
+
+def test_post_import():
+    """Test streaming post ingestion from a JSON-lines file with bad rows mixed in."""
+    print_section("TESTING POST IMPORT")
+    
+    from backend.post_import import ingest_posts, iter_jsonl
+    
+    user = User.query.filter_by(username="testuser").first()
+    group = NewsGroup.query.filter_by(name="Tech Thoughts").first()
+    count_before = group.post_count
+    lines = [
+        json.dumps({"content": "Imported one", "user_id": user.id, "group_id": group.id}),
+        "{not json",
+        json.dumps(["a", "list"]),
+        "",
+        json.dumps({"content": "  ", "user_id": user.id, "group_id": group.id}),
+        json.dumps({"content": "Unknown author", "user_id": -1, "group_id": group.id}),
+        json.dumps({"content": "Bad id", "user_id": "abc", "group_id": group.id}),
+        json.dumps({"content": "Imported two", "title": "Offset", "user_id": user.id, "group_id": group.id,
+                    "timestamp": "2026-01-05T09:30:00+02:00"}),
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "posts.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        
+        # Test 1: good rows go in, every bad one is counted and skipped
+        print("1. Testing ingest_posts() with malformed and invalid lines...")
+        result = ingest_posts(iter_jsonl(path), batch_size=3, batches_per_commit=1)
+        assert (result["inserted"], result["skipped"]) == (2, 5), result
+        print(f"   ✓ Inserted {result['inserted']}, skipped {result['skipped']}")
+    
+    # Test 2: counters and timestamps
+    print("\n2. Testing post counter and timestamp offsets...")
+    db.session.refresh(group)
+    assert group.post_count == count_before + 2
+    offset = Post.query.filter_by(group_id=group.id, title="Offset").one()
+    assert offset.timestamp == datetime(2026, 1, 5, 7, 30)
+    print(f"   ✓ post_count {count_before} -> {group.post_count}; '+02:00' stored as {offset.timestamp} UTC")
+    Post.delete_all_in_group(group.id)
+
+def test_search():
+    """Test full-text search: query quoting, ranking and escaped snippets."""
+    print_section("TESTING SEARCH")
+    
+    from backend.search import init_search, search_groups, search_posts, to_match_query
+    
+    # Test 1: user input can't inject FTS5 syntax
+    print("1. Testing to_match_query()...")
+    assert to_match_query('C++ AND "drop" NEAR(x') == '"C" "AND" "drop" "NEAR" "x"*'
+    assert to_match_query("  !?  ") is None and to_match_query(None) is None
+    print(f"   ✓ {to_match_query('journal* OR -tech')}")
+    
+    # Test 2: title matches outrank content matches; the last word matches as a prefix
+    print("\n2. Testing ranking...")
+    assert init_search()
+    user = User.query.filter_by(username="testuser").first()
+    group = NewsGroup.query.filter_by(name="Tech Thoughts").first()
+    body = Post.create(title="Weekend notes", content="Tried a zephyrcraft kit today.", user_id=user.id, group_id=group.id)
+    title = Post.create(title="Zephyrcraft review", content="Worth it.", user_id=user.id, group_id=group.id)
+    results, has_more = search_posts("zephyrcr")
+    assert [r["id"] for r in results] == [title.id, body.id] and not has_more
+    assert search_groups("tech thou")[0][0]["id"] == group.id
+    print(f"   ✓ Order: {', '.join(repr(r['title']) for r in results)}")
+    
+    # Test 3: snippets are escaped around the <mark> tags
+    print("\n3. Testing snippet escaping...")
+    Post.create(title="Markup", content="<script>alert(1)</script> zephyrcraft & more", user_id=user.id, group_id=group.id)
+    snippet = next(r["snippet"] for r in search_posts("zephyrcraft")[0] if r["title"] == "Markup")
+    assert "<script>" not in snippet and "&lt;script&gt;" in snippet and "<mark>zephyrcraft</mark>" in snippet
+    print(f"   ✓ {snippet}")
+    
+    # Test 4: the index follows edits and deletes
+    print("\n4. Testing index updates...")
+    title.edit_content(new_title="Kit review")
+    assert title.id not in [r["id"] for r in search_posts("zephyrcraft")[0]]
+    Post.delete_all_in_group(group.id)
+    assert search_posts("zephyrcraft")[0] == []
+    print("   ✓ Edited and deleted posts no longer match")
+
+def test_http_cache():
+    """Test conditional GETs (304) and compression of the JSON API."""
+    print_section("TESTING HTTP CACHING")
+    
+    from backend.app import create_app
+    from backend.http_cache import validators_match
+    
+    api_app = create_app("sqlite://")
+    client = api_app.test_client()
+    with api_app.app_context():
+        group = client.post("/api/groups", json={"name": "Tech Thoughts", "category": "technology"}).get_json()
+        url = f"/api/groups/{group['id']}/posts"
+        for i in range(10):
+            client.post(url, json={"content": f"Post {i}: " + "long enough to compress " * 10})
+        
+        # Test 1: large bodies are gzipped for clients that accept it, with a weak ETag
+        print("1. Testing gzip compression...")
+        plain = client.get(url)
+        zipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in plain.headers and not plain.headers["ETag"].startswith("W/")
+        assert zipped.headers["Content-Encoding"] == "gzip" and zipped.headers["ETag"].startswith("W/")
+        assert json.loads(gzip.decompress(zipped.data)) == plain.get_json()
+        assert "Accept-Encoding" in zipped.headers["Vary"]
+        print(f"   ✓ {len(plain.data)} bytes -> {len(zipped.data)} gzipped")
+        small = client.post("/api/groups", json={"name": "Tech Thoughts", "category": "technology"},
+                            headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in small.headers
+        print(f"   ✓ {len(small.data)}-byte body left uncompressed")
+        
+        # Test 2: a matching ETag (strong or weak) gets an empty 304
+        print("\n2. Testing If-None-Match...")
+        for etag in (plain.headers["ETag"], zipped.headers["ETag"]):
+            cached = client.get(url, headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+            assert cached.status_code == 304 and cached.data == b""
+        print("   ✓ 304 Not Modified for both validators")
+        
+        # Test 3: a new post changes the validator
+        print("\n3. Testing that a new post invalidates the ETag...")
+        client.post(url, json={"content": "One more"})
+        fresh = client.get(url, headers={"If-None-Match": plain.headers["ETag"]})
+        assert fresh.status_code == 200 and fresh.get_json()["posts"][0]["content"] == "One more"
+        print(f"   ✓ 200 with new ETag {fresh.headers['ETag']}")
+    
+    # Test 4: If-Modified-Since is compared at second precision, and If-None-Match wins
+    print("\n4. Testing If-Modified-Since...")
+    modified = datetime(2026, 1, 5, 9, 30, 0, 500000, tzinfo=timezone.utc)
+    assert validators_match("abc", modified, None, "Mon, 05 Jan 2026 09:30:00 GMT")
+    assert not validators_match("abc", modified, None, "Mon, 05 Jan 2026 09:29:59 GMT")
+    assert not validators_match("abc", modified, '"other"', "Mon, 05 Jan 2026 09:30:00 GMT")
+    print("   ✓ Dates and ETags compared as expected")
+
+def test_static_server():
+    """Test dummy_website/serve.py: ETags, precompressed variants and cache lifetimes."""
+    print_section("TESTING STATIC FILE SERVER")
+    
+    import http.client
+    import http.server
+    from dummy_website import serve
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            "index.html": b"<html>" + b"hello " * 100 + b"</html>",
+            "app.3f2a9c1b.js": b"console.log('hi');",
+            "big.bin": os.urandom(serve.MAX_CACHED_FILE + 1000),
+        }
+        for name, body in files.items():
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(body)
+        with open(os.path.join(tmp, "index.html.gz"), "wb") as f:
+            f.write(gzip.compress(files["index.html"]))
+        
+        handler = type("QuietHandler", (serve.Handler,), {"log_message": lambda self, *args: None})
+        server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), lambda *args, **kwargs: handler(*args, directory=tmp, **kwargs)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        
+        def get(path, method="GET", **headers):
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_port)
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+            connection.close()
+            return response, body
+        
+        try:
+            # Test 1: ETag revalidation
+            print("1. Testing ETag and 304...")
+            response, body = get("/index.html")
+            assert response.status == 200 and body == files["index.html"]
+            assert response.getheader("Cache-Control") == serve.REVALIDATE
+            cached, body = get("/index.html", **{"If-None-Match": response.getheader("ETag")})
+            assert cached.status == 304 and body == b""
+            print(f"   ✓ 304 for ETag {response.getheader('ETag')}")
+            
+            # Test 2: the .gz sibling is served to clients that accept gzip, under its own ETag
+            print("\n2. Testing precompressed variants...")
+            zipped, body = get("/index.html", **{"Accept-Encoding": "br;q=0, gzip"})
+            assert zipped.getheader("Content-Encoding") == "gzip" and gzip.decompress(body) == files["index.html"]
+            assert zipped.getheader("Vary") == "Accept-Encoding" and zipped.getheader("ETag") != response.getheader("ETag")
+            print(f"   ✓ {len(files['index.html'])} bytes served as {len(body)} gzipped")
+            
+            # A variant older than its source is stale and skipped
+            stat = os.stat(os.path.join(tmp, "index.html"))
+            os.utime(os.path.join(tmp, "index.html.gz"), ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+            stale, body = get("/index.html", **{"Accept-Encoding": "gzip"})
+            assert stale.getheader("Content-Encoding") is None and body == files["index.html"]
+            print("   ✓ Stale .gz ignored")
+            
+            # Test 3: fingerprinted names are immutable; HEAD has headers but no body
+            print("\n3. Testing fingerprinted assets and HEAD...")
+            response, body = get("/app.3f2a9c1b.js", method="HEAD")
+            assert response.getheader("Cache-Control") == serve.IMMUTABLE and body == b""
+            assert response.getheader("Content-Length") == str(len(files["app.3f2a9c1b.js"]))
+            print(f"   ✓ {response.getheader('Cache-Control')}")
+            
+            # Test 4: large files are streamed from disk intact; missing files are 404
+            print("\n4. Testing a large file and a missing one...")
+            response, body = get("/big.bin")
+            assert body == files["big.bin"]
+            assert get("/missing.txt")[0].status == 404
+            print(f"   ✓ Streamed {len(body)} bytes")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+def test_site_build():
+    """Test dummy_website/build.py: bundling, fingerprints and unused-CSS pruning with the safelist."""
+    print_section("TESTING SITE BUILD")
+    
+    import re
+    from dummy_website import build
+    
+    page = """<html><head>
+    <link rel="stylesheet" href="css/base.css">
+    <link rel="stylesheet" href="css/extra.css">
+    </head><body class="card" id="main">
+    <script src="js/app.js"></script>
+    </body></html>"""
+    css = {
+        "css/base.css": ".card { color: red; }\n.unused-thing { color: blue; }\n#main, .nowhere { margin: 0; }",
+        "css/extra.css": "/* tooltip */ .bs-tooltip-auto { top: 0; }\n@media (min-width: 1px) { .gone { x: y; } .open { x: y; } }",
+    }
+    js = "document.body.classList.add('open');"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source, out = os.path.join(tmp, "site"), os.path.join(tmp, "dist")
+        for path, text in {"index.html": page, "js/app.js": js, **css}.items():
+            os.makedirs(os.path.dirname(os.path.join(source, path)), exist_ok=True)
+            with open(os.path.join(source, path), "w", encoding="utf-8") as f:
+                f.write(text)
+        
+        # Test 1: adjacent tags become one fingerprinted bundle per kind
+        print("1. Testing bundling and fingerprinting...")
+        builder = build.Builder(source=source, out=out)
+        report, _ = builder.build()
+        assert report["index.html"] == (3, 2)
+        with open(os.path.join(out, "index.html"), encoding="utf-8") as f:
+            html = f.read()
+        bundle = re.search(r'href="(assets/css/bundle\.[0-9a-f]+\.css)"', html).group(1)
+        with open(os.path.join(out, bundle), encoding="utf-8") as f:
+            minified = f.read()
+        print(f"   ✓ index.html: 3 local requests -> 2 ({bundle})")
+        
+        # Test 2: rules for names no page or script mentions are dropped; safelisted ones stay
+        print("\n2. Testing unused-CSS pruning and SAFELIST...")
+        for kept in (".card{", "#main{", ".bs-tooltip-auto{", ".open{"):
+            assert kept in minified, kept
+        for dropped in (".unused-thing", ".nowhere", ".gone", "/*"):
+            assert dropped not in minified, dropped
+        assert builder.css_stats == {"selectors": 7, "dropped": 3}
+        print(f"   ✓ Dropped {builder.css_stats['dropped']} of {builder.css_stats['selectors']} selectors: {minified}")
+        
+        # Test 3: --keep-unused-css keeps every rule
+        print("\n3. Testing keep_unused_css...")
+        everything = build.Builder(source=source, out=out, keep_unused_css=True)
+        everything.build()
+        assert everything.css_stats["dropped"] == 0
+        print(f"   ✓ Kept all {everything.css_stats['selectors']} selectors")
+
+def test_images():
+    """Test uploaded image variants, the pixel limit and the profile picture endpoint."""
+    print_section("TESTING IMAGE UPLOADS")
+    
+    import io
+    from backend import images
+    from backend.app import create_app
+    
+    if not images.images_available():
+        print("   - Pillow isn't installed; skipped")
+        return
+    from PIL import Image
+    
+    def encoded(image, fmt="PNG"):
+        buffer = io.BytesIO()
+        image.save(buffer, fmt)
+        return buffer.getvalue()
+    
+    saved_path = os.environ.get("IMAGE_STORE_PATH")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["IMAGE_STORE_PATH"] = tmp
+        try:
+            # Test 1: fixed widths, never upscaled, in every format
+            print("1. Testing variant sizes...")
+            upload = encoded(Image.new("RGBA", (1000, 500), (255, 0, 0, 128)))
+            stored = images.store_image(upload)
+            assert stored["widths"] == [160, 320, 640, 1000] and (stored["width"], stored["height"]) == (1000, 500)
+            for ext in images.FORMATS:
+                for width, name in stored["variants"][ext].items():
+                    with Image.open(os.path.join(tmp, name)) as variant:
+                        assert variant.size == (width, width // 2), (name, variant.size)
+                        assert ext != "jpg" or variant.mode == "RGB"
+            print(f"   ✓ Widths {stored['widths']} as {', '.join(images.FORMATS)}")
+            
+            # Test 2: the same bytes map to the same files
+            print("\n2. Testing a repeat upload...")
+            assert images.store_image(upload) == stored
+            print(f"   ✓ Same id {stored['id']}")
+            
+            # Test 3: oversized dimensions and non-images are refused before decoding
+            print("\n3. Testing MAX_PIXELS and invalid files...")
+            bomb = encoded(Image.new("1", (8000, images.MAX_PIXELS // 8000 + 1)))
+            for data in (bomb, b"not an image"):
+                try:
+                    images.store_image(data)
+                    raise AssertionError("upload was accepted")
+                except ValueError as e:
+                    print(f"   ✓ Refused {len(data)} bytes: {e}")
+            
+            # Test 4: the profile picture is saved as a path, the response has absolute URLs
+            print("\n4. Testing POST /api/users/<id>/pfp...")
+            api_app = create_app("sqlite://")
+            client = api_app.test_client()
+            with api_app.app_context():
+                user = User(username="picture", email="picture@example.com")
+                db.session.add(user)
+                db.session.commit()
+                response = client.post(f"/api/users/{user.id}/pfp", data={"image": (io.BytesIO(upload), "me.png")})
+                body = response.get_json()
+                assert response.status_code == 200 and body["pfp"].startswith("/images/")
+                assert body["image"]["url"] == "http://localhost" + body["pfp"]
+                assert client.get(body["pfp"]).status_code == 200
+                print(f"   ✓ User.pfp = {body['pfp']}")
+                too_big = client.post("/api/images", data=b"x" * (api_app.config["MAX_CONTENT_LENGTH"] + 1),
+                                      content_type="multipart/form-data; boundary=x")
+                assert too_big.status_code == 413
+                print("   ✓ Oversized request body refused with 413")
+        finally:
+            if saved_path is None:
+                os.environ.pop("IMAGE_STORE_PATH", None)
+            else:
+                os.environ["IMAGE_STORE_PATH"] = saved_path
+
+def test_metrics():
+    """Test that /metrics is valid Prometheus text and labels requests by route."""
+    print_section("TESTING METRICS")
+    
+    import re
+    from backend import metrics
+    from backend.app import create_app
+    
+    api_app = create_app("sqlite://")
+    client = api_app.test_client()
+    with api_app.app_context():
+        group = client.post("/api/groups", json={"name": "Tech Thoughts", "category": "technology"}).get_json()
+        for _ in range(3):
+            client.get(f"/api/groups/{group['id']}/posts")
+        response = client.get("/metrics")
+    
+    # Test 1: every line is a HELP/TYPE comment or a well-formed sample
+    print("1. Testing the exposition format...")
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    sample = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]\w*="(\\.|[^"\\])*",?)*\})? -?[0-9.e+-]+(Inf)?$')
+    types = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+        elif not line.startswith("# HELP "):
+            assert sample.match(line), line
+    assert types["notable_http_request_duration_seconds"] == "histogram"
+    assert types["notable_cache_hit_ratio"] == "gauge"
+    print(f"   ✓ {len(text.splitlines())} lines, {len(types)} metrics")
+    
+    # Test 2: requests are labelled by URL rule, and histogram buckets are cumulative
+    print("\n2. Testing route labels and histogram buckets...")
+    route = 'route="/api/groups/<int:group_id>/posts"'
+    buckets = [
+        int(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+        if line.startswith("notable_http_request_queries_bucket") and route in line
+    ]
+    count = next(
+        int(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+        if line.startswith("notable_http_request_queries_count") and route in line
+    )
+    assert buckets == sorted(buckets) and buckets[-1] == count >= 3
+    assert f"/api/groups/{group['id']}/posts" not in text
+    print(f"   ✓ {count} requests recorded under {route}")
+    
+    # Test 3: label values are escaped
+    print("\n3. Testing label escaping...")
+    labels = metrics._format_labels(("path",), ('a "b"\\c\nd',))
+    assert labels == '{path="a \\"b\\"\\\\c\\nd"}'
+    print(f"   ✓ {labels}")
+
+def test_password_pool():
+    """Test the password hashing pool's start method and its answer when saturated."""
+    print_section("TESTING PASSWORD HASHING POOL")
+    
+    from backend.app import create_app
+    
+    # Test 1: workers aren't forked from this (threaded) process
+    print("1. Testing the pool's start method...")
+    saved = (passwords.WORKERS, passwords.MAX_PENDING, passwords.QUEUE_TIMEOUT)
+    passwords.configure(workers=1)
+    try:
+        start_method = passwords._executor()._mp_context.get_start_method()
+        assert start_method in ("forkserver", "spawn")
+        assert passwords.verify_password(passwords.hash_password("pool check"), "pool check")
+        print(f"   ✓ Hashed in a {start_method} worker")
+        
+        # Test 2: a saturated pool raises HashingBusy, which the API turns into a 503
+        print("\n2. Testing a saturated pool...")
+        passwords.configure(max_pending=1)
+        passwords.QUEUE_TIMEOUT = 0.05
+        api_app = create_app("sqlite://")
+        api_app.add_url_rule("/test-hash", "test_hash", lambda: passwords.hash_password("busy") and "ok")
+        assert passwords._pending.acquire(timeout=1)  # the one slot is taken
+        try:
+            response = api_app.test_client().get("/test-hash")
+        finally:
+            passwords._pending.release()
+        assert response.status_code == 503 and response.headers["Retry-After"].isdigit()
+        print(f"   ✓ {response.status_code}, Retry-After: {response.headers['Retry-After']}")
+    finally:
+        passwords.configure(workers=saved[0], max_pending=saved[1])
+        passwords.QUEUE_TIMEOUT = saved[2]
 
 def display_all_data():
     """Display all current data in the database."""
@@ -369,6 +1211,22 @@ def main():
         test_newsgroup_post_methods()
         test_newsgroup_member_operations()
         test_user_group_association()
+        test_serialization_query_counts()
+        test_live_updates()
+        test_cold_start_imports()
+        test_prompt_cache()
+        test_single_flight()
+        test_batched_prompts()
+        test_async_prompt_flight()
+        test_posts_api()
+        test_post_import()
+        test_search()
+        test_http_cache()
+        test_static_server()
+        test_site_build()
+        test_images()
+        test_metrics()
+        test_password_pool()
         display_all_data()
         
         print_section("ALL TESTS COMPLETED")